@@ -0,0 +1,88 @@
+import os
+import threading
+import uuid
+from collections import deque
+
+# Number of individual node/edge changes retained for delta queries
+MAX_CHANGES = int(os.getenv("GRAPH_CHANGELOG_SIZE", "50000"))
+
+
+class GraphChangeLog:
+    """
+    Monotonically versioned, bounded log of graph writes.
+    Every recorded write bumps the version; clients that fall further
+    behind than the retained window are told to reload the full graph.
+    Versions restart at 0 in every process, so each log also has a random
+    `epoch`: a client holding a version from another process (e.g. before
+    a restart or deploy) is told to reload as well.
+    """
+
+    def __init__(self, max_changes=MAX_CHANGES):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self.epoch = uuid.uuid4().hex[:12]
+        self._entries = deque(maxlen=max_changes)
+        self._version = 0
+        # Highest version that has lost at least one entry to eviction
+        self._truncated_through = 0
+
+    @property
+    def version(self):
+        return self._version
+
+    def record(self, nodes=(), edges=()):
+        """Append nodes and edges (Cytoscape element dicts) under a new version."""
+        with self._lock:
+            self._version += 1
+            for node in nodes:
+                self._append((self._version, "nodes", node))
+            for edge in edges:
+                self._append((self._version, "edges", edge))
+            self._changed.notify_all()
+            return self._version
+
+    def wait_for_change(self, version, timeout=None):
+        """Block until the log moves past `version` or `timeout` expires; returns the current version."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version, timeout)
+            return self._version
+
+    def changes_since(self, since, epoch=None):
+        """
+        Return every node and edge written after `since`, latest state per id.
+        `reset` is set when the requested version has already been evicted,
+        or was issued under another epoch (None skips the epoch check).
+        """
+        with self._lock:
+            version = self._version
+            if (epoch is not None and epoch != self.epoch) \
+                    or since < self._truncated_through or since > version:
+                return {"epoch": self.epoch, "version": version, "reset": True, "nodes": [], "edges": []}
+
+            # Entries are version-ordered: walk back from the newest and stop at `since`
+            # so a poll costs the number of new entries, not the size of the log
+            newer = []
+            for entry in reversed(self._entries):
+                if entry[0] <= since:
+                    break
+                newer.append(entry)
+
+        changed = {"nodes": {}, "edges": {}}
+        for _, group, element in reversed(newer):
+            changed[group][element["data"]["id"]] = element
+
+        return {
+            "epoch": self.epoch,
+            "version": version,
+            "reset": False,
+            "nodes": list(changed["nodes"].values()),
+            "edges": list(changed["edges"].values()),
+        }
+
+    def _append(self, entry):
+        if len(self._entries) == self._entries.maxlen:
+            self._truncated_through = self._entries[0][0]
+        self._entries.append(entry)
+
+
+changelog = GraphChangeLog()
@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import threading
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls: the first caller for a key runs
+    the function, callers arriving while it is in flight wait for and
+    share its result (or exception). Results are shared, not copied, so
+    callers must not mutate them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+def coalesced(fn):
+    """Decorator: concurrent calls with the same arguments share one execution."""
+    flight = SingleFlight()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        return flight.do(key, fn, *args, **kwargs)
+
+    return wrapper
+
+
+class PoolFull(Exception):
+    """Raised when an admission pool has no free slot and no queue space."""
+
+
+class AdmissionPool:
+    """
+    Bounded concurrency for a class of requests: at most `max_concurrent`
+    run at once and at most `max_queue` wait; anything beyond is rejected
+    immediately so the caller can answer 429 instead of piling up work.
+    """
+
+    def __init__(self, name, max_concurrent, max_queue, retry_after=1):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.pending = 0
+        self._semaphore = None
+
+    async def run(self, handler):
+        if self.pending >= self.max_concurrent + self.max_queue:
+            raise PoolFull(self.name)
+        # Created lazily so it binds to the server's running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent)
+
+        self.pending += 1
+        try:
+            async with self._semaphore:
+                return await handler()
+        finally:
+            self.pending -= 1
@@ -1,193 +1,144 @@
-from .database import db
+from .storage import storage
+from .concurrency import coalesced
+from .velocity import velocity
+from .changes import changelog
+from .stats import stats
 
 def create_user(user_data):
-    query = """
-    MERGE (u:User {user_id: $user_id})
-    SET u.name = $name,
-        u.email = $email,
-        u.phone = $phone,
-        u.address = $address,
-        u.payment_method = $payment_method
-    RETURN u
-    """
-    db.query(query, user_data)
+    previous = storage.upsert_user(user_data)
+    stats.record_attributes("user", previous, user_data)
 
-    detect_user_relationships(user_data["user_id"])
+    skip = stats.hub_attributes("user", user_data)
+    edges = detect_user_relationships(user_data["user_id"], skip=skip)
+    changelog.record(nodes=[user_node(user_data)], edges=edges)
 
 def create_transaction(txn_data):
-    query = """
-    MERGE (t:Transaction {txn_id: $txn_id})
-    SET t.amount = $amount,
-        t.device_id = $device_id,
-        t.ip_address = $ip_address
-    WITH t
-    MATCH (s:User {user_id: $sender_id}), (r:User {user_id: $receiver_id})
-    MERGE (s)-[:SENT]->(t)
-    MERGE (t)-[:RECEIVED_BY]->(r)
-    RETURN t
-    """
-    db.query(query, txn_data)
+    previous, created = storage.upsert_transaction(txn_data)
+    stats.record_attributes("transaction", previous, txn_data)
+    stats.record_edges(created)
+
+    # Re-posting an existing txn_id is an update, not another transaction
+    if _is_new(previous, "txn_id"):
+        velocity.record_transaction(txn_data)
+    skip = stats.hub_attributes("transaction", txn_data)
+    edges = [graph_edge(*edge) for edge in created]
+    edges += detect_transaction_relationships(txn_data["txn_id"], skip=skip)
+    changelog.record(nodes=[transaction_node(txn_data)], edges=edges)
 
-    detect_transaction_relationships(txn_data["txn_id"])
+def _is_new(previous, id_field):
+    """An upsert created the node if it had no properties besides its id before the write"""
+    return all(key == id_field for key in previous)
 
 def get_all_users(limit: int = 200):
-    return db.query("MATCH (u:User) RETURN u LIMIT $limit", {"limit": limit})
+    return storage.get_users(limit)
 
 def get_all_transactions(limit: int = 200):
-    return db.query("MATCH (t:Transaction) RETURN t LIMIT $limit", {"limit": limit})
-
-
-def detect_user_relationships(user_id):
-    """Find users with shared attributes and create specific relationship edges."""
-    
-    # Email Links
-    email_query = """
-    MATCH (u1:User {user_id: $user_id}), (u2:User)
-    WHERE u1 <> u2
-      AND u1.email IS NOT NULL 
-      AND u1.email = u2.email
-    MERGE (u1)-[:SHARED_EMAIL]->(u2)
-    """
-    db.query(email_query, {"user_id": user_id})
-    
-    # Phone Links
-    phone_query = """
-    MATCH (u1:User {user_id: $user_id}), (u2:User)
-    WHERE u1 <> u2
-      AND u1.phone IS NOT NULL 
-      AND u1.phone = u2.phone
-    MERGE (u1)-[:SHARED_PHONE]->(u2)
-    """
-    db.query(phone_query, {"user_id": user_id})
-    
-    # Address Links
-    address_query = """
-    MATCH (u1:User {user_id: $user_id}), (u2:User)
-    WHERE u1 <> u2
-      AND u1.address IS NOT NULL 
-      AND u1.address = u2.address
-    MERGE (u1)-[:SHARED_ADDRESS]->(u2)
-    """
-    db.query(address_query, {"user_id": user_id})
-    
-    # Payment Method Links
-    payment_query = """
-    MATCH (u1:User {user_id: $user_id}), (u2:User)
-    WHERE u1 <> u2
-      AND u1.payment_method IS NOT NULL 
-      AND u1.payment_method = u2.payment_method
-    MERGE (u1)-[:SHARED_PAYMENT_METHOD]->(u2)
-    """
-    db.query(payment_query, {"user_id": user_id})
-    
-    # Create Credit/Debit Links (direct transaction relationships)
-    credit_query = """
-    MATCH (u:User {user_id: $user_id})-[:SENT]->(t:Transaction)-[:RECEIVED_BY]->(other:User)
-    MERGE (u)-[:CREDIT_TO]->(other)
-    """
-    db.query(credit_query, {"user_id": user_id})
-    
-    debit_query = """
-    MATCH (other:User)-[:SENT]->(t:Transaction)-[:RECEIVED_BY]->(u:User {user_id: $user_id})
-    MERGE (u)-[:DEBIT_FROM]->(other)
+    return storage.get_transactions(limit)
+
+
+def _record_links(links):
+    """Count newly created links in stats and return them as graph edges"""
+    created = [
+        (source_id, target_id, rel_type)
+        for source_id, target_id, rel_type, is_new in links
+        if is_new
+    ]
+    stats.record_edges(created)
+    return [graph_edge(*edge) for edge in created]
+
+def detect_user_relationships(user_id, skip=()):
     """
-    db.query(debit_query, {"user_id": user_id})
-
-def detect_transaction_relationships(txn_id):
-    """Link transactions that share same device or IP, and create Credit/Debit links."""
-    
-    # Device ID Links
-    device_query = """
-    MATCH (t1:Transaction {txn_id: $txn_id}), (t2:Transaction)
-    WHERE t1 <> t2
-      AND t1.device_id IS NOT NULL 
-      AND t1.device_id = t2.device_id
-    MERGE (t1)-[:SHARED_DEVICE]->(t2)
+    Find users with shared attributes (email, phone, address, payment method)
+    and create specific relationship edges, plus Credit/Debit links.
+    Attribute kinds in `skip` (e.g. hub values above the cardinality cap) are not linked.
+    Returns the newly created edges in graph (Cytoscape) format.
     """
-    db.query(device_query, {"txn_id": txn_id})
-    
-    # IP Address Links
-    ip_query = """
-    MATCH (t1:Transaction {txn_id: $txn_id}), (t2:Transaction)
-    WHERE t1 <> t2
-      AND t1.ip_address IS NOT NULL 
-      AND t1.ip_address = t2.ip_address
-    MERGE (t1)-[:SHARED_IP]->(t2)
+    return _record_links(storage.link_user(user_id, skip=skip))
+
+def detect_transaction_relationships(txn_id, skip=()):
     """
-    db.query(ip_query, {"txn_id": txn_id})
-    
-    # Create/Update Credit and Debit Links for users involved in this transaction
-    update_user_links_query = """
-    MATCH (s:User)-[:SENT]->(t:Transaction {txn_id: $txn_id})-[:RECEIVED_BY]->(r:User)
-    MERGE (s)-[:CREDIT_TO]->(r)
-    MERGE (r)-[:DEBIT_FROM]->(s)
+    Link transactions that share same device or IP, and create Credit/Debit links.
+    Attribute kinds in `skip` (device, ip) are not linked.
+    Returns the newly created edges in graph (Cytoscape) format.
     """
-    db.query(update_user_links_query, {"txn_id": txn_id})
+    return _record_links(storage.link_transaction(txn_id, skip=skip))
 
-def get_graph_data():
+def user_node(user):
+    """Format a user record as a graph (Cytoscape) node."""
+    return {
+        "data": {
+            "id": user["user_id"],
+            "label": user.get("name", user["user_id"]),
+            "type": "user",
+            **user
+        }
+    }
+
+def transaction_node(txn):
+    """Format a transaction record as a graph (Cytoscape) node."""
+    properties = {k: v for k, v in txn.items() if k not in ("sender_id", "receiver_id")}
+    return {
+        "data": {
+            "id": txn["txn_id"],
+            "label": f"${txn.get('amount', 0)}",
+            "type": "transaction",
+            **properties
+        }
+    }
+
+def graph_edge(source_id, target_id, rel_type):
+    """Format a relationship as a graph (Cytoscape) edge."""
+    return {
+        "data": {
+            "id": f"{source_id}-{rel_type}-{target_id}",
+            "source": source_id,
+            "target": target_id,
+            "type": rel_type
+        }
+    }
+
+def get_graph_changes(since: int, epoch=None):
+    """Nodes written and edges created after the given change-feed version and epoch."""
+    return changelog.changes_since(since, epoch)
+
+def get_subgraph(node_ids, edge_limit: int = 2000):
+    """Nodes with the given ids and the edges between them, in graph format"""
+    users, transactions = storage.get_nodes(node_ids)
+    nodes = [user_node(user) for user in users] + [transaction_node(txn) for txn in transactions]
+    edges = [
+        graph_edge(source_id, target_id, rel_type)
+        for source_id, target_id, rel_type in storage.get_edges_between(node_ids, edge_limit)
+    ]
+
+    return {"nodes": nodes, "edges": edges}
+
+def get_top_stats(kind: str, by: str = "degree", n: int = 100):
+    """Most connected users/transactions, or most shared attribute values"""
+    stats.ensure_loaded()
+    return stats.top(kind, by, n)
+
+@coalesced
+def get_graph_data(user_limit: int = 200, txn_limit: int = 500):
     """
     Fetch nodes and edges for visualization
+    Picks the most connected users and transactions from the degree statistics,
+    or arbitrary ones while the statistics are still loading
     Includes all relationship types: transactions, shared attributes, devices, IPs
     Ensures edges only reference nodes that exist in the result set
     """
-    nodes = []
-    edges = []
-    node_ids = set()
-    
-    # Fetch users
-    users_result = db.query("MATCH (u:User) RETURN u LIMIT 200")
-    for record in users_result:
-        user = dict(record["u"])
-        user_id = user["user_id"]
-        node_ids.add(user_id)
-        nodes.append({
-            "data": {
-                "id": user_id,
-                "label": user.get("name", user_id),
-                "type": "user",
-                **user
-            }
-        })
-    
-    # Fetch transactions
-    txns_result = db.query("MATCH (t:Transaction) RETURN t LIMIT 500")
-    for record in txns_result:
-        txn = dict(record["t"])
-        txn_id = txn["txn_id"]
-        node_ids.add(txn_id)
-        nodes.append({
-            "data": {
-                "id": txn_id,
-                "label": f"${txn.get('amount', 0)}",
-                "type": "transaction",
-                **txn
-            }
-        })
-    
-    # Fetch all edges but only include those where both source and target exist in node_ids
-    all_edges_result = db.query("""
-        MATCH (n)-[r]->(m)
-        RETURN DISTINCT 
-            CASE WHEN 'User' IN labels(n) THEN n.user_id ELSE n.txn_id END as source_id,
-            CASE WHEN 'User' IN labels(m) THEN m.user_id ELSE m.txn_id END as target_id,
-            type(r) as rel_type
-        LIMIT 2000
-    """)
-    
-    for record in all_edges_result:
-        source_id = record["source_id"]
-        target_id = record["target_id"]
-        rel_type = record["rel_type"]
-        
-        # Only add edge if both nodes exist
-        if source_id in node_ids and target_id in node_ids:
-            edges.append({
-                "data": {
-                    "id": f"{source_id}-{rel_type}-{target_id}",
-                    "source": source_id,
-                    "target": target_id,
-                    "type": rel_type
-                }
-            })
-    
-    return {"nodes": nodes, "edges": edges}
+    # Read the version first so clients may re-apply, but never miss, later writes
+    cursor = {"epoch": changelog.epoch, "version": changelog.version}
+
+    if stats.loaded:
+        node_ids = [entry["key"] for entry in stats.top("user", "degree", user_limit)]
+        node_ids += [entry["key"] for entry in stats.top("transaction", "degree", txn_limit)]
+        if node_ids:
+            return {**get_subgraph(node_ids), **cursor}
+    else:
+        # Load in the background (once, backing off after a failure) instead of blocking this read
+        stats.load_in_background()
+
+    # No degree statistics (yet, or a graph without edges): fall back to arbitrary nodes
+    node_ids = [user["user_id"] for user in storage.get_users(user_limit)]
+    node_ids += [txn["txn_id"] for txn in storage.get_transactions(txn_limit)]
+    return {**get_subgraph(node_ids), **cursor}
@@ -1,22 +1,76 @@
 from neo4j import GraphDatabase
 import os
+import threading
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Uniqueness constraints and indexes backing the MERGE and detection lookups
+SCHEMA_STATEMENTS = [
+    "CREATE CONSTRAINT user_id_unique IF NOT EXISTS FOR (u:User) REQUIRE u.user_id IS UNIQUE",
+    "CREATE CONSTRAINT txn_id_unique IF NOT EXISTS FOR (t:Transaction) REQUIRE t.txn_id IS UNIQUE",
+    "CREATE INDEX user_email IF NOT EXISTS FOR (u:User) ON (u.email)",
+    "CREATE INDEX user_phone IF NOT EXISTS FOR (u:User) ON (u.phone)",
+    "CREATE INDEX user_address IF NOT EXISTS FOR (u:User) ON (u.address)",
+    "CREATE INDEX user_payment_method IF NOT EXISTS FOR (u:User) ON (u.payment_method)",
+    "CREATE INDEX txn_device_id IF NOT EXISTS FOR (t:Transaction) ON (t.device_id)",
+    "CREATE INDEX txn_ip_address IF NOT EXISTS FOR (t:Transaction) ON (t.ip_address)",
+]
+
 class Neo4jConnection:
+    """Neo4j access with the driver created lazily on first use"""
+
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.uri = uri
+        self.auth = (user, password)
+        self._driver = None
+        self._lock = threading.Lock()
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            with self._lock:
+                if self._driver is None:
+                    self._driver = GraphDatabase.driver(self.uri, auth=self.auth)
+        return self._driver
 
     def close(self):
-        self.driver.close()
+        with self._lock:
+            if self._driver is not None:
+                self._driver.close()
+                self._driver = None
+
+    def verify_connectivity(self):
+        self.driver.verify_connectivity()
+
+    def bootstrap_schema(self):
+        """Run each schema statement on its own; returns {statement: error} for those that failed"""
+        failures = {}
+        for statement in SCHEMA_STATEMENTS:
+            try:
+                self.query(statement)
+            except Exception as e:
+                failures[statement] = str(e)
+        return failures
 
     def query(self, query, parameters=None):
         with self.driver.session() as session:
             result = session.run(query, parameters or {})
             return [r.data() for r in result]
 
+    def write(self, query, parameters=None):
+        """Run a write in a managed transaction, retried on transient errors such as deadlocks"""
+        with self.driver.session() as session:
+            return session.execute_write(lambda tx: tx.run(query, parameters or {}).data())
+
+    def stream(self, query, parameters=None):
+        """Yield records one at a time instead of materialising the whole result"""
+        with self.driver.session() as session:
+            result = session.run(query, parameters or {})
+            for record in result:
+                yield record.data()
+
 # Load from environment or defaults
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER") or os.getenv("NEO4J_USERNAME", "neo4j")
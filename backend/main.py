@@ -1,14 +1,174 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.staticfiles import StaticFiles
+import time
+
+# Taken before the heavier imports so startup metrics cover them
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from .models import User, Transaction
 from . import crud, relationships
-from .database import db
+from .velocity import velocity, KINDS
+from .summary import summaries, SUMMARY_MODES, SummaryLoading
+from .storage import storage
+from .concurrency import AdmissionPool, PoolFull
+from .stats import stats
+from .static import PrecompressedStaticFiles
+from contextlib import asynccontextmanager
+from typing import Optional
+import anyio.to_thread
+import asyncio
+import json
 import os
+import threading
+
+# How often the change stream checks for new writes
+GRAPH_STREAM_POLL_SECONDS = float(os.getenv("GRAPH_STREAM_POLL_SECONDS", "1.0"))
+
+# Separate admission pools so ingest bursts cannot starve reads
+read_pool = AdmissionPool(
+    "read",
+    max_concurrent=int(os.getenv("READ_MAX_CONCURRENCY", "32")),
+    max_queue=int(os.getenv("READ_MAX_QUEUE", "256")),
+)
+write_pool = AdmissionPool(
+    "write",
+    max_concurrent=int(os.getenv("WRITE_MAX_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("WRITE_MAX_QUEUE", "64")),
+    retry_after=int(os.getenv("WRITE_RETRY_AFTER_SECONDS", "1")),
+)
+
+# Long-lived or trivial endpoints that never hold a pool slot
+UNPOOLED_PATHS = {"/health", "/graph/stream"}
+
+# Worker threads on top of the pool slots, for sync endpoints that hold no slot (e.g. /health)
+UNPOOLED_THREADS = int(os.getenv("UNPOOLED_THREADS", "8"))
+
+# Load degree/cardinality statistics during warm-up rather than on first use
+WARMUP_STATS = os.getenv("WARMUP_STATS", "true").lower() in ("1", "true", "yes")
 
-app = FastAPI(title="User & Transaction Graph API")
+# Also build the graph summaries during warm-up instead of after the first /graph/summary
+WARMUP_SUMMARIES = os.getenv("WARMUP_SUMMARIES", "true").lower() in ("1", "true", "yes")
+
+# Possible frontend locations
+FRONTEND_DIRS = [
+    os.path.join(os.path.dirname(__file__), '../frontend'),
+    os.path.join(os.getcwd(), 'frontend'),
+    '/app/frontend'  # Railway/Docker path
+]
+
+startup = {
+    "ready_seconds": None,
+    "first_request_seconds": None,
+    "warmup": "pending",
+    "warmup_failures": {},
+    "warmup_seconds": None,
+}
+
+def warm_up():
+    """
+    Check connectivity, then bootstrap the schema and run hot read queries once.
+    Each schema statement and step runs even if an earlier one failed;
+    failures are listed in startup["warmup_failures"].
+    """
+    started = time.perf_counter()
+    failures = {}
+    try:
+        storage.verify_connectivity()
+    except Exception as e:
+        # Every later step would only wait out the same connection timeout
+        failures["connectivity"] = str(e)
+    else:
+        steps = [
+            ("schema", lambda: failures.update(
+                (f"schema: {statement}", error) for statement, error in storage.bootstrap_schema().items()
+            )),
+            ("user relationships", lambda: relationships.get_user_relationships("__warmup__")),
+            ("transaction relationships", lambda: relationships.get_transaction_relationships("__warmup__")),
+            ("users", lambda: crud.get_all_users(1)),
+            ("transactions", lambda: crud.get_all_transactions(1)),
+        ]
+        if WARMUP_STATS:
+            steps.append(("stats", stats.ensure_loaded))
+        if WARMUP_SUMMARIES:
+            steps += [(f"summary: {mode}", summary.refresh) for mode, summary in summaries.items()]
+
+        for name, step in steps:
+            try:
+                step()
+            except Exception as e:
+                failures[name] = str(e)
+
+        if WARMUP_SUMMARIES:
+            # Keep them current from here on (and retry any that failed above)
+            for summary in summaries.values():
+                summary.start()
+
+    for name, error in failures.items():
+        print(f"⚠ Warm-up step '{name}' failed: {error}")
+    startup["warmup"] = f"failed: {', '.join(failures)}" if failures else "complete"
+    startup["warmup_failures"] = failures
+    startup["warmup_seconds"] = round(time.perf_counter() - started, 4)
+
+def mount_frontend(app):
+    frontend_path = next((path for path in FRONTEND_DIRS if os.path.isdir(path)), None)
+    if frontend_path:
+        print(f"✓ Serving frontend from: {frontend_path}")
+        app.mount("/", PrecompressedStaticFiles(directory=frontend_path, html=True), name="frontend")
+    else:
+        print("⚠ Frontend directory not found. API-only mode.")
+        print(f"  Searched paths: {FRONTEND_DIRS}")
+
+def size_threadpool():
+    """
+    Size AnyIO's shared thread limiter (40 by default) from the admission pools.
+    Every sync endpoint runs on it, so unless there is a thread for each read and
+    write slot, raising either pool's concurrency lets one class starve the other.
+    Coalesced callers wait on a thread too, but they also hold a read slot.
+    """
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    limiter.total_tokens = read_pool.max_concurrent + write_pool.max_concurrent + UNPOOLED_THREADS
+
+@asynccontextmanager
+async def lifespan(app):
+    size_threadpool()
+    # Mounted last so the catch-all frontend route never shadows API routes
+    mount_frontend(app)
+    # Warm up in the background: the server accepts requests immediately.
+    # A daemon thread, so an unreachable database cannot hold up shutdown.
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    startup["ready_seconds"] = round(time.perf_counter() - IMPORT_STARTED, 4)
+    yield
+    for summary in summaries.values():
+        summary.stop()
+    storage.close()
+
+app = FastAPI(title="User & Transaction Graph API", lifespan=lifespan)
+
+@app.middleware("http")
+async def record_first_request(request: Request, call_next):
+    response = await call_next(request)
+    if startup["first_request_seconds"] is None:
+        startup["first_request_seconds"] = round(time.perf_counter() - IMPORT_STARTED, 4)
+    return response
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Run reads and writes in bounded pools, answering 429 when a pool is saturated"""
+    if request.url.path in UNPOOLED_PATHS or request.method == "OPTIONS":
+        return await call_next(request)
+
+    pool = read_pool if request.method in ("GET", "HEAD") else write_pool
+    try:
+        return await pool.run(lambda: call_next(request))
+    except PoolFull:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": f"Too many concurrent {pool.name} requests, retry later"},
+            headers={"Retry-After": str(pool.retry_after)}
+        )
 
+# Added after the admission middleware so 429 responses still carry CORS headers
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -22,18 +182,18 @@ def health_check():
     """Health check endpoint to verify API and database connectivity"""
     try:
         # Test database connection
-        result = db.query("RETURN 1 AS test")
-        db_status = "connected" if result else "disconnected"
+        db_status = "connected" if storage.ping() else "disconnected"
         
         # Get node counts
-        node_count = db.query("MATCH (n) RETURN count(n) AS count")
-        total_nodes = node_count[0]["count"] if node_count else 0
+        total_nodes = storage.count_nodes()
         
         return {
             "status": "healthy",
             "database": db_status,
+            "storage": storage.name,
             "total_nodes": total_nodes,
-            "api_version": "1.0"
+            "api_version": "1.0",
+            "startup": startup
         }
     except Exception as e:
         return JSONResponse(
@@ -41,7 +201,8 @@ def health_check():
             content={
                 "status": "unhealthy",
                 "database": "disconnected",
-                "error": str(e)
+                "error": str(e),
+                "startup": startup
             }
         )
 
@@ -61,16 +222,14 @@ def add_transaction(txn: Transaction):
 @app.get("/users")
 def list_users():
     try:
-        users = crud.get_all_users()
-        return [record.get("u", record) for record in users]
+        return crud.get_all_users()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/transactions")
 def list_transactions():
     try:
-        transactions = crud.get_all_transactions()
-        return [record.get("t", record) for record in transactions]
+        return crud.get_all_transactions()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -82,6 +241,96 @@ def get_graph():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/graph/changes")
+def get_graph_changes(since: int = 0, epoch: Optional[str] = None):
+    """
+    Get nodes added or updated and edges created after a change-feed version.
+    Pass the `epoch` returned alongside the version: `reset: true` means the
+    version is too old or from another server process, and /graph must be reloaded.
+    """
+    return crud.get_graph_changes(since, epoch)
+
+@app.get("/graph/stream")
+async def stream_graph_changes(
+    since: int = 0,
+    epoch: Optional[str] = None,
+    last_event_id: Optional[str] = Header(None)
+):
+    """
+    Server-Sent Events stream of graph changes, one event per new version.
+    Event ids are `epoch:version`; on reconnect the browser's Last-Event-ID
+    takes precedence over `since` and `epoch`.
+    """
+    if last_event_id is not None:
+        event_epoch, _, event_version = last_event_id.rpartition(":")
+        if event_version.isdigit():
+            since, epoch = int(event_version), event_epoch or None
+
+    async def event_stream():
+        version, current_epoch = since, epoch
+        while True:
+            changes = crud.get_graph_changes(version, current_epoch)
+            if changes["reset"] or changes["version"] != version:
+                version, current_epoch = changes["version"], changes["epoch"]
+                yield f"id: {current_epoch}:{version}\ndata: {json.dumps(changes)}\n\n"
+            await asyncio.sleep(GRAPH_STREAM_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+def _get_summary(mode: str):
+    if mode not in SUMMARY_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown summary mode '{mode}'. Expected one of: {', '.join(SUMMARY_MODES)}"
+        )
+    summary = summaries[mode]
+    # Builds in the background on first use (when not done at warm-up)
+    summary.start()
+    return summary
+
+def _summary_loading(mode: str):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"The {mode} summary is still being built, retry later"},
+        headers={"Retry-After": "5"}
+    )
+
+@app.get("/graph/summary")
+def get_graph_summary(mode: str = "component", limit: int = 200):
+    """
+    Get the graph collapsed into clusters (super-nodes) with inter-cluster edge weights.
+    Modes: component (connected components), shared (shared-attribute clusters,
+    other relationships as edge weights), community (label propagation)
+    Answers 503 with Retry-After while a summary is first being built.
+    """
+    summary = _get_summary(mode)
+    try:
+        return summary.get_summary(limit)
+    except SummaryLoading:
+        return _summary_loading(mode)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/graph/summary/{cluster_id}")
+def get_graph_cluster(cluster_id: str, mode: str = "component", limit: int = 500):
+    """Drill down into one cluster, returning its member nodes and their edges"""
+    summary = _get_summary(mode)
+    try:
+        cluster = summary.get_members(cluster_id, limit)
+        if cluster is None:
+            raise HTTPException(status_code=404, detail=f"Cluster {cluster_id} not found")
+        return {**cluster, **crud.get_subgraph(cluster["members"])}
+    except SummaryLoading:
+        return _summary_loading(mode)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/relationships/user/{user_id}")
 def get_user_relationships_endpoint(user_id: str):
     """
@@ -117,23 +366,29 @@ def get_transaction_relationships_endpoint(txn_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-# Mount frontend static files
-# Try multiple possible frontend locations
-frontend_dirs = [
-    os.path.join(os.path.dirname(__file__), '../frontend'),
-    os.path.join(os.getcwd(), 'frontend'),
-    '/app/frontend'  # Railway/Docker path
-]
+@app.get("/stats/top")
+def get_top_stats(kind: str = "user", by: str = "degree", n: int = 100):
+    """
+    Most connected entities of a kind.
+    - kind=user|transaction ranks nodes by total degree or by a relationship type (e.g. by=SHARED_IP)
+    - kind=email|phone|address|payment_method|device|ip ranks values by how many nodes share them
+    """
+    try:
+        return {"kind": kind, "by": by, "top": crud.get_top_stats(kind, by, n)}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-frontend_path = None
-for path in frontend_dirs:
-    if os.path.exists(path) and os.path.isdir(path):
-        frontend_path = path
-        break
-
-if frontend_path:
-    print(f"✓ Serving frontend from: {frontend_path}")
-    app.mount("/", StaticFiles(directory=frontend_path, html=True), name="frontend")
-else:
-    print("⚠ Frontend directory not found. API-only mode.")
-    print(f"  Searched paths: {frontend_dirs}")
+@app.get("/velocity/{kind}/{key}")
+def get_velocity_endpoint(kind: str, key: str):
+    """
+    Transaction counts for a device, IP or sending user over the
+    last minute, hour and day, served from in-process counters.
+    """
+    if kind not in KINDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown velocity kind '{kind}'. Expected one of: {', '.join(KINDS)}"
+        )
+    return {"kind": kind, "key": key, "counts": velocity.get_counts(kind, key)}
@@ -1,5 +1,7 @@
-from .database import db
+from .storage import storage
+from .concurrency import coalesced
 
+@coalesced
 def get_user_relationships(user_id: str):
     """
     Fetch all connections of a user, including:
@@ -7,16 +9,10 @@ def get_user_relationships(user_id: str):
     - Shared attribute relationships (Email, Phone, Address, Payment Method)
     - Connected users and transaction details
     """
-    query = """
-    MATCH (u:User {user_id: $user_id})
-    OPTIONAL MATCH (u)-[r]-(connected)
-    RETURN u, 
-           type(r) as relationship_type, 
-           labels(connected) as connected_labels,
-           connected,
-           r
-    """
-    result = db.query(query, {"user_id": user_id})
+    result = storage.get_neighbours("User", user_id)
+    if result is None:
+        return None
+    _, neighbours = result
     
     relationships = {
         "user_id": user_id,
@@ -30,18 +26,11 @@ def get_user_relationships(user_id: str):
         "all_connections": []
     }
     
-    for record in result:
-        if not record.get("connected"):
-            continue
-            
-        rel_type = record.get("relationship_type")
-        connected = dict(record["connected"])
-        labels = record.get("connected_labels", [])
-        
+    for rel_type, node_type, connected in neighbours:
         connection_info = {
             "relationship_type": rel_type,
             "connected": connected,
-            "node_type": labels[0] if labels else "Unknown"
+            "node_type": node_type
         }
         
         relationships["all_connections"].append(connection_info)
@@ -64,6 +53,7 @@ def get_user_relationships(user_id: str):
     
     return relationships
 
+@coalesced
 def get_transaction_relationships(txn_id: str):
     """
     Fetch all connections of a transaction, including:
@@ -71,16 +61,10 @@ def get_transaction_relationships(txn_id: str):
     - Other transactions sharing device/IP
     - Transaction metadata
     """
-    query = """
-    MATCH (t:Transaction {txn_id: $txn_id})
-    OPTIONAL MATCH (t)-[r]-(connected)
-    RETURN t,
-           type(r) as relationship_type,
-           labels(connected) as connected_labels,
-           connected,
-           r
-    """
-    result = db.query(query, {"txn_id": txn_id})
+    result = storage.get_neighbours("Transaction", txn_id)
+    if result is None:
+        return None
+    transaction, neighbours = result
     
     relationships = {
         "txn_id": txn_id,
@@ -88,24 +72,15 @@ def get_transaction_relationships(txn_id: str):
         "receiver": None,
         "shared_device": [],
         "shared_ip": [],
-        "all_connections": []
+        "all_connections": [],
+        "transaction_details": transaction
     }
     
-    for record in result:
-        if not record.get("connected"):
-            # First record might just have transaction info
-            if record.get("t"):
-                relationships["transaction_details"] = dict(record["t"])
-            continue
-            
-        rel_type = record.get("relationship_type")
-        connected = dict(record["connected"])
-        labels = record.get("connected_labels", [])
-        
+    for rel_type, node_type, connected in neighbours:
         connection_info = {
             "relationship_type": rel_type,
             "connected": connected,
-            "node_type": labels[0] if labels else "Unknown"
+            "node_type": node_type
         }
         
         relationships["all_connections"].append(connection_info)
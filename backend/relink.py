@@ -0,0 +1,390 @@
+"""
+Maintenance command: rebuild every derived relationship in the graph.
+
+Recreates missing SHARED_* and CREDIT_TO/DEBIT_FROM edges and removes
+stale ones (attributes no longer shared, no backing transaction, or a
+value shared by more than --max-cardinality nodes) without reposting any
+records. Work is split into batches of attribute values or user ids and
+spread over a process pool; each worker has its own driver and runs
+batched UNWIND writes in its own sessions. Linking a value compares every
+pair of its nodes, so value batches are also bounded by --max-pairs, and a
+value too widely shared for one batch is split into chunks of its nodes.
+
+Usage:
+    python -m backend.relink --dry-run
+    python -m backend.relink --workers 8 --batch-size 500
+    python -m backend.relink --resume
+
+A running API keeps in-process caches (stats, summaries, change feed);
+restart it after relinking so they are rebuilt from the database.
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .database import Neo4jConnection, NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+from .stats import MAX_LINK_CARDINALITY
+
+# Shared-attribute relationship -> (node label, id property, attribute property)
+ATTRIBUTE_RULES = {
+    "SHARED_EMAIL": ("User", "user_id", "email"),
+    "SHARED_PHONE": ("User", "user_id", "phone"),
+    "SHARED_ADDRESS": ("User", "user_id", "address"),
+    "SHARED_PAYMENT_METHOD": ("User", "user_id", "payment_method"),
+    "SHARED_DEVICE": ("Transaction", "txn_id", "device_id"),
+    "SHARED_IP": ("Transaction", "txn_id", "ip_address"),
+}
+
+# Money-flow relationship -> pattern from the batched user `u` to the `other` user
+FLOW_RULES = {
+    "CREDIT_TO": "(u)-[:SENT]->(:Transaction)-[:RECEIVED_BY]->(other:User)",
+    "DEBIT_FROM": "(other:User)-[:SENT]->(:Transaction)-[:RECEIVED_BY]->(u)",
+}
+
+DEFAULT_CHECKPOINT = "relink_checkpoint.jsonl"
+
+# Candidate node pairs (rows) one link batch may compare in its transaction
+DEFAULT_MAX_PAIRS = 100_000
+
+
+def _link_attribute_query(rel_type, dry_run):
+    label, id_field, field = ATTRIBUTE_RULES[rel_type]
+    # One edge per pair that shares a value, from the larger to the smaller id
+    query = f"""
+    UNWIND $values AS value
+    MATCH (n:{label} {{{field}: value}})
+    WITH value, collect(n) AS nodes
+    WHERE $max_cardinality <= 0 OR size(nodes) <= $max_cardinality
+    UNWIND nodes AS a
+    UNWIND nodes AS b
+    WITH a, b
+    WHERE a.{id_field} > b.{id_field} AND NOT (a)-[:{rel_type}]-(b)
+    """
+    return _merge_pairs(query, rel_type, dry_run)
+
+
+def _link_hub_query(rel_type, dry_run):
+    label, id_field, field = ATTRIBUTE_RULES[rel_type]
+    # One chunk of a widely shared value: its nodes in $ids against every node with the value
+    query = f"""
+    UNWIND $ids AS id
+    MATCH (a:{label} {{{id_field}: id}})
+    WHERE a.{field} = $value
+    MATCH (b:{label} {{{field}: $value}})
+    WHERE a.{id_field} > b.{id_field} AND NOT (a)-[:{rel_type}]-(b)
+    """
+    return _merge_pairs(query, rel_type, dry_run)
+
+
+def _merge_pairs(query, rel_type, dry_run):
+    if dry_run:
+        return query + "RETURN count(*) AS count"
+    return query + f"""
+    MERGE (a)-[r:{rel_type}]->(b)
+      ON CREATE SET r.created_at = timestamp()
+    RETURN count(r) AS count
+    """
+
+
+def _prune_attribute_query(rel_type, dry_run):
+    label, id_field, field = ATTRIBUTE_RULES[rel_type]
+    # Values over the cardinality cap are not linked, so their existing edges are stale too
+    query = f"""
+    UNWIND $ids AS id
+    MATCH (a:{label} {{{id_field}: id}})
+    WITH a, $max_cardinality > 0 AND a.{field} IS NOT NULL
+        AND COUNT {{ (:{label} {{{field}: a.{field}}}) }} > $max_cardinality AS hub
+    MATCH (a)-[r:{rel_type}]->(b:{label})
+    WHERE hub OR a.{field} IS NULL OR b.{field} IS NULL OR a.{field} <> b.{field}
+    """
+    if dry_run:
+        return query + "RETURN count(r) AS count"
+    return query + "DELETE r RETURN count(*) AS count"
+
+
+def _link_flow_query(rel_type, dry_run):
+    query = f"""
+    UNWIND $ids AS id
+    MATCH (u:User {{user_id: id}})
+    MATCH {FLOW_RULES[rel_type]}
+    WITH DISTINCT u, other
+    WHERE NOT (u)-[:{rel_type}]->(other)
+    """
+    if dry_run:
+        return query + "RETURN count(*) AS count"
+    return query + f"""
+    MERGE (u)-[r:{rel_type}]->(other)
+      ON CREATE SET r.created_at = timestamp()
+    RETURN count(r) AS count
+    """
+
+
+def _prune_flow_query(rel_type, dry_run):
+    query = f"""
+    UNWIND $ids AS id
+    MATCH (u:User {{user_id: id}})-[r:{rel_type}]->(other:User)
+    WHERE NOT EXISTS {{ MATCH {FLOW_RULES[rel_type]} }}
+    """
+    if dry_run:
+        return query + "RETURN count(r) AS count"
+    return query + "DELETE r RETURN count(*) AS count"
+
+
+def _batches(items, batch_size):
+    for start in range(0, len(items), batch_size):
+        yield start // batch_size, items[start:start + batch_size]
+
+
+def _value_batches(counts, batch_size, max_pairs):
+    """
+    Group (value, node count) into batches of at most `batch_size` values
+    whose nodes make at most `max_pairs` candidate pairs in total.
+    """
+    batch, pairs = [], 0
+    for value, count in counts:
+        if batch and (len(batch) == batch_size or pairs + count * count > max_pairs):
+            yield batch
+            batch, pairs = [], 0
+        batch.append(value)
+        pairs += count * count
+    if batch:
+        yield batch
+
+
+def _fingerprint(batch):
+    """Identifies a batch's contents, so a resumed run notices when data shifted under a task id"""
+    digest = hashlib.sha1(json.dumps(batch, default=str).encode()).hexdigest()[:16]
+    return f"{len(batch)}:{digest}"
+
+
+def _task(task_id, action, rel_type, key, batch):
+    return {"id": task_id, "action": action, "rel_type": rel_type, key: batch, "fingerprint": _fingerprint(batch)}
+
+
+def plan_tasks(db, batch_size, max_cardinality=MAX_LINK_CARDINALITY, max_pairs=DEFAULT_MAX_PAIRS):
+    """
+    Split the rebuild into independent tasks.
+    Inputs are sorted so a re-run over unchanged data produces the same
+    task ids and fingerprints for resuming.
+    """
+    tasks = []
+    ids = {
+        label: [
+            record["id"]
+            for record in db.stream(f"MATCH (n:{label}) RETURN n.{id_field} AS id ORDER BY id")
+        ]
+        for label, id_field in (("User", "user_id"), ("Transaction", "txn_id"))
+    }
+
+    for rel_type, (label, id_field, field) in ATTRIBUTE_RULES.items():
+        counts = [
+            (record["value"], record["count"])
+            for record in db.stream(
+                f"MATCH (n:{label}) WHERE n.{field} IS NOT NULL "
+                f"RETURN n.{field} AS value, count(*) AS count ORDER BY value"
+            )
+            # Values over the cap are never linked (their edges are pruned below)
+            if max_cardinality <= 0 or record["count"] <= max_cardinality
+        ]
+        shared = [(value, count) for value, count in counts if 1 < count and count * count <= max_pairs]
+        for index, batch in enumerate(_value_batches(shared, batch_size, max_pairs)):
+            tasks.append(_task(f"link:{rel_type}:{index}", "link", rel_type, "values", batch))
+
+        for value, count in counts:
+            if count * count <= max_pairs:
+                continue
+            node_ids = [
+                record["id"]
+                for record in db.stream(
+                    f"MATCH (n:{label} {{{field}: $value}}) RETURN n.{id_field} AS id ORDER BY id",
+                    {"value": value}
+                )
+            ]
+            # Each node in a chunk is compared with every node sharing the value
+            for index, chunk in _batches(node_ids, max(1, max_pairs // len(node_ids))):
+                task = _task(f"link:{rel_type}:{value}:{index}", "link", rel_type, "ids", chunk)
+                tasks.append({**task, "value": value})
+
+        for index, batch in _batches(ids[label], batch_size):
+            tasks.append(_task(f"prune:{rel_type}:{index}", "prune", rel_type, "ids", batch))
+
+    for rel_type in FLOW_RULES:
+        for index, batch in _batches(ids["User"], batch_size):
+            tasks.append(_task(f"link:{rel_type}:{index}", "link", rel_type, "ids", batch))
+            tasks.append(_task(f"prune:{rel_type}:{index}", "prune", rel_type, "ids", batch))
+
+    return tasks
+
+
+# ---- worker process -------------------------------------------------------
+
+_worker_db = None
+
+
+def _init_worker():
+    global _worker_db
+    _worker_db = Neo4jConnection(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+
+
+def run_task(task, dry_run=False, max_cardinality=MAX_LINK_CARDINALITY):
+    """Run one batch in this worker's session; returns (task id, action, rel type, edge count)."""
+    rel_type, action = task["rel_type"], task["action"]
+    if rel_type in ATTRIBUTE_RULES:
+        if action == "link" and "value" in task:
+            query = _link_hub_query(rel_type, dry_run)
+            params = {"ids": task["ids"], "value": task["value"]}
+        elif action == "link":
+            query = _link_attribute_query(rel_type, dry_run)
+            params = {"values": task["values"], "max_cardinality": max_cardinality}
+        else:
+            query = _prune_attribute_query(rel_type, dry_run)
+            params = {"ids": task["ids"], "max_cardinality": max_cardinality}
+    else:
+        builder = _link_flow_query if action == "link" else _prune_flow_query
+        query = builder(rel_type, dry_run)
+        params = {"ids": task["ids"]}
+
+    run = _worker_db.query if dry_run else _worker_db.write
+    result = run(query, params)
+    return task["id"], action, rel_type, result[0]["count"] if result else 0
+
+
+# ---- checkpointing --------------------------------------------------------
+#
+# The checkpoint is a JSON-lines log: a header with the settings that shape
+# the plan, then one line per completed task, appended as tasks finish.
+
+class CheckpointMismatch(Exception):
+    pass
+
+
+def load_checkpoint(path, settings):
+    """
+    Completed task id -> fingerprint from a previous run.
+    Raises CheckpointMismatch if that run used different settings.
+    """
+    if not os.path.exists(path):
+        return {}
+    completed = {}
+    with open(path) as f:
+        header = json.loads(f.readline() or "{}")
+        if header != settings:
+            raise CheckpointMismatch(
+                f"Checkpoint {path} was written with {header}, this run uses {settings}. "
+                f"Re-run with the same options, or without --resume to start over."
+            )
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # line torn by an interrupted write
+            completed[entry["id"]] = entry["fingerprint"]
+    return completed
+
+
+def open_checkpoint(path, settings, resume):
+    """Open the checkpoint log for appending, starting a new one unless resuming."""
+    if resume and os.path.exists(path):
+        return open(path, "a")
+    f = open(path, "w")
+    f.write(json.dumps(settings) + "\n")
+    f.flush()
+    return f
+
+
+# ---- command --------------------------------------------------------------
+
+def relink(workers=4, batch_size=500, dry_run=False, resume=False, checkpoint=DEFAULT_CHECKPOINT,
+           max_cardinality=MAX_LINK_CARDINALITY, max_pairs=DEFAULT_MAX_PAIRS):
+    """Rebuild (or, with dry_run, count) derived relationships; returns edge counts per type."""
+    settings = {"batch_size": batch_size, "max_cardinality": max_cardinality, "max_pairs": max_pairs}
+    completed = load_checkpoint(checkpoint, settings) if resume and not dry_run else {}
+
+    planner = Neo4jConnection(NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD)
+    try:
+        tasks = plan_tasks(planner, batch_size, max_cardinality, max_pairs)
+    finally:
+        planner.close()
+
+    pending = [task for task in tasks if completed.get(task["id"]) != task["fingerprint"]]
+    changed = sum(1 for task in pending if task["id"] in completed)
+    print(f"📋 {len(tasks):,} tasks planned, {len(tasks) - len(pending):,} already done, "
+          f"{len(pending):,} to run on {workers} workers"
+          f"{f' ({changed:,} re-run because their data changed)' if changed else ''}"
+          f"{' (dry run)' if dry_run else ''}")
+
+    totals = {
+        rel_type: {"added": 0, "removed": 0}
+        for rel_type in [*ATTRIBUTE_RULES, *FLOW_RULES]
+    }
+    fingerprints = {task["id"]: task["fingerprint"] for task in pending}
+    log = None if dry_run else open_checkpoint(checkpoint, settings, resume)
+    start_time = time.time()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = [executor.submit(run_task, task, dry_run, max_cardinality) for task in pending]
+            try:
+                for done, future in enumerate(as_completed(futures), 1):
+                    task_id, action, rel_type, count = future.result()
+                    totals[rel_type]["added" if action == "link" else "removed"] += count
+                    if log is not None:
+                        log.write(json.dumps({"id": task_id, "fingerprint": fingerprints[task_id]}) + "\n")
+                        log.flush()
+
+                    elapsed = time.time() - start_time
+                    rate = done / elapsed if elapsed > 0 else 0
+                    print(f"\r  Progress: {done:,}/{len(pending):,} tasks | {rate:.1f} tasks/sec", end="", flush=True)
+            except BaseException:
+                # Stop queued batches instead of running them unrecorded; only in-flight ones finish
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    finally:
+        if log is not None:
+            log.close()
+
+    print()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild derived SHARED_* and CREDIT_TO/DEBIT_FROM relationships")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="worker processes")
+    parser.add_argument("--batch-size", type=int, default=500, help="attribute values or user ids per batch")
+    parser.add_argument("--dry-run", action="store_true", help="only count edges that would be added/removed")
+    parser.add_argument("--resume", action="store_true", help="skip batches completed by a previous run")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT, help="checkpoint file for --resume")
+    parser.add_argument("--max-cardinality", type=int, default=MAX_LINK_CARDINALITY,
+                        help="do not link attribute values shared by more nodes than this (0 = no cap)")
+    parser.add_argument("--max-pairs", type=int, default=DEFAULT_MAX_PAIRS,
+                        help="candidate node pairs compared per link batch; wider values are split up")
+    args = parser.parse_args()
+
+    try:
+        totals = relink(
+            workers=args.workers,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+            resume=args.resume,
+            checkpoint=args.checkpoint,
+            max_cardinality=args.max_cardinality,
+            max_pairs=args.max_pairs,
+        )
+    except CheckpointMismatch as e:
+        parser.error(str(e))
+
+    verb = ("would be added", "would be removed") if args.dry_run else ("added", "removed")
+    print(f"\n{'Relationship':<24}{verb[0]:>18}{verb[1]:>18}")
+    for rel_type, counts in totals.items():
+        print(f"{rel_type:<24}{counts['added']:>18,}{counts['removed']:>18,}")
+
+    if not args.dry_run and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+        print(f"\n✓ Relinking complete, checkpoint {args.checkpoint} removed")
+
+
+if __name__ == "__main__":
+    main()
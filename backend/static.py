@@ -0,0 +1,72 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+
+from fastapi.staticfiles import StaticFiles
+from starlette.responses import Response
+
+# Compressing tiny files costs more than it saves
+MIN_COMPRESS_BYTES = 512
+
+
+class _Asset:
+    __slots__ = ("body", "gzipped", "etag", "media_type")
+
+    def __init__(self, body, media_type):
+        self.body = body
+        self.media_type = media_type
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        compressed = gzip.compress(body, compresslevel=9) if len(body) >= MIN_COMPRESS_BYTES else None
+        self.gzipped = compressed if compressed is not None and len(compressed) < len(body) else None
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles that reads the (small) frontend once, precompresses it
+    with gzip and serves it from memory with strong ETags, answering
+    304 for revalidations. Files added after startup fall back to disk.
+    """
+
+    def __init__(self, *, directory, html=False):
+        super().__init__(directory=directory, html=html)
+        self.assets = {}
+        for root, _, files in os.walk(directory):
+            for name in files:
+                full_path = os.path.join(root, name)
+                relative = os.path.relpath(full_path, directory).replace(os.sep, "/")
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                with open(full_path, "rb") as f:
+                    self.assets[relative] = _Asset(f.read(), media_type)
+
+    async def get_response(self, path, scope):
+        relative = path.replace(os.sep, "/").strip("/")
+        if relative in ("", "."):
+            relative = "index.html" if self.html else relative
+        elif self.html and f"{relative}/index.html" in self.assets:
+            relative = f"{relative}/index.html"
+
+        asset = self.assets.get(relative)
+        if asset is None or scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+
+        headers = dict(
+            (key.decode("latin-1").lower(), value.decode("latin-1"))
+            for key, value in scope["headers"]
+        )
+        response_headers = {
+            "ETag": asset.etag,
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+        if asset.etag in headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=response_headers)
+
+        body = asset.body
+        if asset.gzipped is not None and "gzip" in headers.get("accept-encoding", ""):
+            body = asset.gzipped
+            response_headers["Content-Encoding"] = "gzip"
+        if scope["method"] == "HEAD":
+            response_headers["Content-Length"] = str(len(body))
+            body = b""
+        return Response(body, media_type=asset.media_type, headers=response_headers)
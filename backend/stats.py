@@ -0,0 +1,224 @@
+import os
+import threading
+import time
+from collections import Counter
+
+from .storage import storage
+
+# Attribute kind -> (node kind, property name)
+ATTRIBUTE_KINDS = {
+    "email": ("user", "email"),
+    "phone": ("user", "phone"),
+    "address": ("user", "address"),
+    "payment_method": ("user", "payment_method"),
+    "device": ("transaction", "device_id"),
+    "ip": ("transaction", "ip_address"),
+}
+
+NODE_KINDS = ("user", "transaction")
+
+# Relationship type -> (source node kind, target node kind)
+RELATIONSHIP_ENDPOINTS = {
+    "SENT": ("user", "transaction"),
+    "RECEIVED_BY": ("transaction", "user"),
+    "SHARED_EMAIL": ("user", "user"),
+    "SHARED_PHONE": ("user", "user"),
+    "SHARED_ADDRESS": ("user", "user"),
+    "SHARED_PAYMENT_METHOD": ("user", "user"),
+    "CREDIT_TO": ("user", "user"),
+    "DEBIT_FROM": ("user", "user"),
+    "SHARED_DEVICE": ("transaction", "transaction"),
+    "SHARED_IP": ("transaction", "transaction"),
+}
+
+# Attribute values shared by more nodes than this are not linked pairwise (0 = no cap)
+MAX_LINK_CARDINALITY = int(os.getenv("MAX_LINK_CARDINALITY", "0"))
+
+# After a failed bootstrap, how long to wait before scanning the database again
+STATS_RETRY_SECONDS = float(os.getenv("STATS_RETRY_SECONDS", "60"))
+
+# Node kind -> storage label
+NODE_LABELS = {"user": "User", "transaction": "Transaction"}
+
+
+class GraphStats:
+    """
+    Per-node degrees (total and by relationship type) and per-value
+    attribute cardinalities, kept in memory and updated on ingest.
+    Counters are bootstrapped from storage with aggregate queries once
+    (at warm-up by default). Writes are never blocked by the bootstrap:
+    they keep being recorded while it scans and are folded in at the end,
+    so a write the scan already saw may be counted twice. A failed
+    bootstrap is not retried for STATS_RETRY_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loaded = False
+        self._loading_in_background = False
+        self._retry_at = 0
+        self._last_error = None
+        self.cardinality, self.degree, self.degree_by_type = self._empty_counters()
+
+    @staticmethod
+    def _empty_counters():
+        cardinality = {kind: Counter() for kind in ATTRIBUTE_KINDS}
+        degree = {kind: Counter() for kind in NODE_KINDS}
+        degree_by_type = {
+            (node_kind, rel_type): Counter()
+            for rel_type, endpoints in RELATIONSHIP_ENDPOINTS.items()
+            for node_kind in set(endpoints)
+        }
+        return cardinality, degree, degree_by_type
+
+    def ensure_loaded(self, wait=True):
+        """
+        Bootstrap counters from the database once; later calls are free.
+        With wait=False, return immediately if another thread is loading.
+        Raises the last error, without scanning, while backing off after a failure.
+        """
+        if self.loaded or not self._load_lock.acquire(blocking=wait):
+            return
+        try:
+            if self.loaded:
+                return
+            if time.monotonic() < self._retry_at:
+                raise RuntimeError(f"Graph statistics unavailable, bootstrap failed: {self._last_error}")
+            try:
+                self._load()
+            except Exception as e:
+                self._retry_at = time.monotonic() + STATS_RETRY_SECONDS
+                self._last_error = e
+                raise
+        finally:
+            self._load_lock.release()
+
+    def load_in_background(self):
+        """Start the bootstrap in a daemon thread, unless loaded, already started or backing off."""
+        with self._lock:
+            if self.loaded or self._loading_in_background or time.monotonic() < self._retry_at:
+                return
+            self._loading_in_background = True
+        threading.Thread(target=self._background_load, name="stats-load", daemon=True).start()
+
+    def _background_load(self):
+        try:
+            self.ensure_loaded()
+        except Exception as e:
+            print(f"⚠ Graph statistics bootstrap failed, retrying in {STATS_RETRY_SECONDS:g}s at the earliest: {e}")
+        finally:
+            with self._lock:
+                self._loading_in_background = False
+
+    def _load(self):
+        with self._lock:
+            # The scan sees every write recorded so far; only deltas from here on are kept
+            self.cardinality, self.degree, self.degree_by_type = self._empty_counters()
+
+        # Scanned without holding the counter lock so ingest keeps flowing
+        cardinality, degree, degree_by_type = self._empty_counters()
+        for kind, (node_kind, field) in ATTRIBUTE_KINDS.items():
+            for value, count in storage.attribute_counts(NODE_LABELS[node_kind], field):
+                cardinality[kind][value] = count
+        for node_kind, label in NODE_LABELS.items():
+            for node_id, rel_type, count in storage.degree_counts(label):
+                degree[node_kind][node_id] += count
+                if (node_kind, rel_type) in degree_by_type:
+                    degree_by_type[(node_kind, rel_type)][node_id] += count
+
+        with self._lock:
+            # Fold in the deltas recorded while the scan ran
+            for loaded, recorded in (
+                (cardinality, self.cardinality),
+                (degree, self.degree),
+                (degree_by_type, self.degree_by_type),
+            ):
+                for key, counts in recorded.items():
+                    loaded[key].update(counts)
+                    loaded[key] += Counter()  # drop values whose count fell to zero
+            self.cardinality, self.degree, self.degree_by_type = cardinality, degree, degree_by_type
+            self.loaded = True
+
+    def record_attributes(self, node_kind, previous, current):
+        """Move cardinality counts from a node's previous attribute values to its current ones."""
+        with self._lock:
+            for kind, (attribute_node_kind, field) in ATTRIBUTE_KINDS.items():
+                if attribute_node_kind != node_kind:
+                    continue
+                old_value, new_value = previous.get(field), current.get(field)
+                if old_value == new_value:
+                    continue
+                counts = self.cardinality[kind]
+                if old_value is not None:
+                    counts[old_value] -= 1
+                    # Before the bootstrap a negative count is a pending delta, so only zero is dropped
+                    if counts[old_value] == 0:
+                        del counts[old_value]
+                if new_value is not None:
+                    counts[new_value] += 1
+
+    def record_edges(self, edges):
+        """Count newly created (source_id, target_id, rel_type) edges towards both endpoints."""
+        with self._lock:
+            for source_id, target_id, rel_type in edges:
+                source_kind, target_kind = RELATIONSHIP_ENDPOINTS[rel_type]
+                self.degree[source_kind][source_id] += 1
+                self.degree[target_kind][target_id] += 1
+                self.degree_by_type[(source_kind, rel_type)][source_id] += 1
+                self.degree_by_type[(target_kind, rel_type)][target_id] += 1
+
+    def hub_attributes(self, node_kind, properties, max_cardinality=None):
+        """
+        Attribute kinds whose value on this node is shared by more than `max_cardinality` nodes.
+        Until the bootstrap has run the counters only hold deltas, so each value
+        is counted with an indexed storage lookup instead (and the bootstrap is started).
+        """
+        max_cardinality = MAX_LINK_CARDINALITY if max_cardinality is None else max_cardinality
+        if max_cardinality <= 0:
+            return set()
+        kinds = {
+            kind: properties[field]
+            for kind, (attribute_node_kind, field) in ATTRIBUTE_KINDS.items()
+            if attribute_node_kind == node_kind and properties.get(field) is not None
+        }
+        with self._lock:
+            if self.loaded:
+                return {kind for kind, value in kinds.items() if self.cardinality[kind][value] > max_cardinality}
+
+        self.load_in_background()
+        label = NODE_LABELS[node_kind]
+        return {
+            kind
+            for kind, value in kinds.items()
+            if storage.attribute_count(label, ATTRIBUTE_KINDS[kind][1], value) > max_cardinality
+        }
+
+    def top(self, kind, by="degree", n=100):
+        """
+        Most connected entities of a kind.
+        Node kinds (user, transaction) rank by total degree or by one relationship
+        type; attribute kinds rank values by how many nodes share them.
+        """
+        with self._lock:
+            if kind in ATTRIBUTE_KINDS:
+                if by not in ("degree", "cardinality"):
+                    raise ValueError(f"Attribute kinds can only be ranked by degree or cardinality, not '{by}'")
+                counts = self.cardinality[kind]
+            elif kind in NODE_KINDS:
+                if by == "degree":
+                    counts = self.degree[kind]
+                elif (kind, by) in self.degree_by_type:
+                    counts = self.degree_by_type[(kind, by)]
+                elif by in RELATIONSHIP_ENDPOINTS:
+                    raise ValueError(f"{by} relationships do not involve {kind} nodes")
+                else:
+                    raise ValueError(f"Unknown ranking '{by}'. Expected degree or a relationship type")
+            else:
+                raise ValueError(
+                    f"Unknown kind '{kind}'. Expected one of: {', '.join([*NODE_KINDS, *ATTRIBUTE_KINDS])}"
+                )
+            return [{"key": key, "count": count} for key, count in counts.most_common(n)]
+
+
+stats = GraphStats()
@@ -0,0 +1,21 @@
+import os
+
+from .base import GraphStorage, SHARED_ATTRIBUTES, ID_FIELDS
+from .memory_storage import MemoryStorage
+
+# Which engine backs the API: "neo4j" (default) or "memory" (embedded, no external service)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "neo4j").lower()
+
+
+def create_storage(backend=STORAGE_BACKEND):
+    if backend == "neo4j":
+        # Imported lazily so the embedded engine runs without the Neo4j driver installed
+        from ..database import db
+        from .neo4j_storage import Neo4jStorage
+        return Neo4jStorage(db)
+    if backend == "memory":
+        return MemoryStorage()
+    raise ValueError(f"Unknown storage backend '{backend}'. Expected 'neo4j' or 'memory'")
+
+
+storage = create_storage()
@@ -0,0 +1,128 @@
+from abc import ABC, abstractmethod
+
+# Shared-attribute kind -> (node label, property, relationship type)
+SHARED_ATTRIBUTES = {
+    "email": ("User", "email", "SHARED_EMAIL"),
+    "phone": ("User", "phone", "SHARED_PHONE"),
+    "address": ("User", "address", "SHARED_ADDRESS"),
+    "payment_method": ("User", "payment_method", "SHARED_PAYMENT_METHOD"),
+    "device": ("Transaction", "device_id", "SHARED_DEVICE"),
+    "ip": ("Transaction", "ip_address", "SHARED_IP"),
+}
+
+# Node label -> id property
+ID_FIELDS = {
+    "User": "user_id",
+    "Transaction": "txn_id",
+}
+
+
+class GraphStorage(ABC):
+    """
+    Storage interface behind crud, relationships, stats and summaries.
+
+    Nodes are plain property dicts identified by `user_id` / `txn_id`;
+    edges are (source_id, target_id, rel_type) tuples. Link methods also
+    report whether each edge was newly created so statistics can count it.
+    """
+
+    name = "base"
+
+    # ---- lifecycle --------------------------------------------------------
+
+    def verify_connectivity(self):
+        """Raise if the backend cannot be reached."""
+
+    def bootstrap_schema(self):
+        """
+        Create constraints/indexes the queries rely on (idempotent).
+        Returns {statement: error} for statements that failed.
+        """
+        return {}
+
+    def close(self):
+        """Release connections; the storage may be reused afterwards."""
+
+    @abstractmethod
+    def ping(self):
+        """Whether the backend answers a trivial query."""
+
+    @abstractmethod
+    def count_nodes(self):
+        """Total number of user and transaction nodes."""
+
+    # ---- writes -----------------------------------------------------------
+
+    @abstractmethod
+    def upsert_user(self, user_data):
+        """Create or update a user; returns its properties before the write."""
+
+    @abstractmethod
+    def upsert_transaction(self, txn_data):
+        """
+        Create or update a transaction and link it to its sender and receiver
+        when both exist. Returns (previous properties, newly created edges).
+        """
+
+    @abstractmethod
+    def link_user(self, user_id, skip=()):
+        """
+        Merge SHARED_* edges to users sharing an attribute (kinds in `skip` excluded)
+        and CREDIT_TO/DEBIT_FROM edges from its transactions.
+        Returns (source_id, target_id, rel_type, created) tuples.
+        """
+
+    @abstractmethod
+    def link_transaction(self, txn_id, skip=()):
+        """
+        Merge SHARED_DEVICE/SHARED_IP edges (kinds in `skip` excluded) and the
+        CREDIT_TO/DEBIT_FROM edges between its sender and receiver. Also reports
+        the existing SENT/RECEIVED_BY edges (never as created).
+        Returns (source_id, target_id, rel_type, created) tuples.
+        """
+
+    # ---- reads ------------------------------------------------------------
+
+    @abstractmethod
+    def get_users(self, limit):
+        """Up to `limit` users as property dicts."""
+
+    @abstractmethod
+    def get_transactions(self, limit):
+        """Up to `limit` transactions as property dicts."""
+
+    @abstractmethod
+    def get_nodes(self, node_ids):
+        """Returns (users, transactions) whose ids are in `node_ids`."""
+
+    @abstractmethod
+    def get_edges_between(self, node_ids, limit):
+        """Edges whose endpoints are both in `node_ids`, at most `limit`."""
+
+    @abstractmethod
+    def get_neighbours(self, label, node_id):
+        """
+        Returns None if the node does not exist, otherwise
+        (properties, [(rel_type, connected_label, connected_properties), ...])
+        over relationships in both directions.
+        """
+
+    @abstractmethod
+    def stream_nodes(self):
+        """Yield (node_id, 'user' | 'transaction') for every node."""
+
+    @abstractmethod
+    def stream_edges(self, rel_types=None):
+        """Yield (source_id, target_id, rel_type) for every edge, optionally filtered by type."""
+
+    @abstractmethod
+    def attribute_counts(self, label, field):
+        """Yield (value, node count) for every non-null value of a property."""
+
+    @abstractmethod
+    def attribute_count(self, label, field, value):
+        """Number of nodes whose property equals `value` (an indexed lookup)."""
+
+    @abstractmethod
+    def degree_counts(self, label):
+        """Yield (node_id, rel_type, degree) counting both directions."""
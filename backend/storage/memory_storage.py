@@ -0,0 +1,242 @@
+import threading
+from collections import defaultdict
+
+from .base import GraphStorage, SHARED_ATTRIBUTES, ID_FIELDS
+
+USER_FIELDS = ("name", "email", "phone", "address", "payment_method")
+TRANSACTION_FIELDS = ("amount", "device_id", "ip_address")
+
+NODE_TYPES = {"User": "user", "Transaction": "transaction"}
+
+
+class MemoryStorage(GraphStorage):
+    """
+    Embedded, dependency-free graph storage for tests, benchmarks and edge
+    deployments. Nodes live in dicts keyed by (label, id), every shared
+    attribute has a value -> ids index so detection is a lookup rather
+    than a scan, and edges are kept in outgoing and incoming adjacency maps.
+    Nothing is persisted.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.nodes = {label: {} for label in ID_FIELDS}
+        # (label, field) -> value -> set of node ids
+        self.indexes = {
+            (label, field): defaultdict(set)
+            for label, field, _ in SHARED_ATTRIBUTES.values()
+        }
+        # (label, id) -> rel_type -> set of (label, id)
+        self.outgoing = defaultdict(lambda: defaultdict(set))
+        self.incoming = defaultdict(lambda: defaultdict(set))
+
+    # ---- lifecycle --------------------------------------------------------
+
+    def ping(self):
+        return True
+
+    def count_nodes(self):
+        with self._lock:
+            return sum(len(nodes) for nodes in self.nodes.values())
+
+    # ---- internals --------------------------------------------------------
+
+    def _upsert_node(self, label, node_id, values):
+        nodes = self.nodes[label]
+        previous = dict(nodes.get(node_id, {ID_FIELDS[label]: node_id}))
+
+        for (index_label, field), index in self.indexes.items():
+            if index_label != label or previous.get(field) == values.get(field):
+                continue
+            if previous.get(field) is not None:
+                index[previous[field]].discard(node_id)
+                if not index[previous[field]]:
+                    del index[previous[field]]
+            if values.get(field) is not None:
+                index[values[field]].add(node_id)
+
+        # Like Cypher SET, a null value removes the property
+        current = {ID_FIELDS[label]: node_id}
+        current.update((key, value) for key, value in values.items() if value is not None)
+        nodes[node_id] = current
+        return previous
+
+    def _merge_edge(self, source, rel_type, target):
+        """Create source-[rel_type]->target unless it exists; returns whether it was created."""
+        targets = self.outgoing[source][rel_type]
+        if target in targets:
+            return False
+        targets.add(target)
+        self.incoming[target][rel_type].add(source)
+        return True
+
+    def _edges(self):
+        for source, by_type in self.outgoing.items():
+            for rel_type, targets in by_type.items():
+                for target in targets:
+                    yield source, rel_type, target
+
+    # ---- writes -----------------------------------------------------------
+
+    def upsert_user(self, user_data):
+        with self._lock:
+            values = {field: user_data.get(field) for field in USER_FIELDS}
+            return self._upsert_node("User", user_data["user_id"], values)
+
+    def upsert_transaction(self, txn_data):
+        with self._lock:
+            txn_id = txn_data["txn_id"]
+            values = {field: txn_data.get(field) for field in TRANSACTION_FIELDS}
+            previous = self._upsert_node("Transaction", txn_id, values)
+
+            created = []
+            users = self.nodes["User"]
+            if txn_data["sender_id"] in users and txn_data["receiver_id"] in users:
+                txn = ("Transaction", txn_id)
+                if self._merge_edge(("User", txn_data["sender_id"]), "SENT", txn):
+                    created.append((txn_data["sender_id"], txn_id, "SENT"))
+                if self._merge_edge(txn, "RECEIVED_BY", ("User", txn_data["receiver_id"])):
+                    created.append((txn_id, txn_data["receiver_id"], "RECEIVED_BY"))
+            return previous, created
+
+    def _link_shared(self, label, node_id, skip):
+        links = []
+        node = self.nodes[label].get(node_id)
+        if node is None:
+            return links
+        for kind, (attribute_label, field, rel_type) in SHARED_ATTRIBUTES.items():
+            if attribute_label != label or kind in skip or node.get(field) is None:
+                continue
+            for other_id in sorted(self.indexes[(label, field)][node[field]]):
+                if other_id != node_id:
+                    created = self._merge_edge((label, node_id), rel_type, (label, other_id))
+                    links.append((node_id, other_id, rel_type, created))
+        return links
+
+    def link_user(self, user_id, skip=()):
+        with self._lock:
+            links = self._link_shared("User", user_id, skip)
+            if user_id not in self.nodes["User"]:
+                return links
+            user = ("User", user_id)
+
+            receivers = {
+                receiver
+                for txn in self.outgoing[user]["SENT"]
+                for receiver in self.outgoing[txn]["RECEIVED_BY"]
+            }
+            for receiver in sorted(receivers):
+                created = self._merge_edge(user, "CREDIT_TO", receiver)
+                links.append((user_id, receiver[1], "CREDIT_TO", created))
+
+            senders = {
+                sender
+                for txn in self.incoming[user]["RECEIVED_BY"]
+                for sender in self.incoming[txn]["SENT"]
+            }
+            for sender in sorted(senders):
+                created = self._merge_edge(user, "DEBIT_FROM", sender)
+                links.append((user_id, sender[1], "DEBIT_FROM", created))
+            return links
+
+    def link_transaction(self, txn_id, skip=()):
+        with self._lock:
+            links = self._link_shared("Transaction", txn_id, skip)
+            txn = ("Transaction", txn_id)
+            for sender in sorted(self.incoming[txn]["SENT"]):
+                for receiver in sorted(self.outgoing[txn]["RECEIVED_BY"]):
+                    links += [
+                        (sender[1], txn_id, "SENT", False),
+                        (txn_id, receiver[1], "RECEIVED_BY", False),
+                        (sender[1], receiver[1], "CREDIT_TO", self._merge_edge(sender, "CREDIT_TO", receiver)),
+                        (receiver[1], sender[1], "DEBIT_FROM", self._merge_edge(receiver, "DEBIT_FROM", sender)),
+                    ]
+            return links
+
+    # ---- reads ------------------------------------------------------------
+
+    def get_users(self, limit):
+        with self._lock:
+            return [dict(user) for _, user in zip(range(limit), self.nodes["User"].values())]
+
+    def get_transactions(self, limit):
+        with self._lock:
+            return [dict(txn) for _, txn in zip(range(limit), self.nodes["Transaction"].values())]
+
+    def get_nodes(self, node_ids):
+        with self._lock:
+            users, txns = self.nodes["User"], self.nodes["Transaction"]
+            return (
+                [dict(users[node_id]) for node_id in node_ids if node_id in users],
+                [dict(txns[node_id]) for node_id in node_ids if node_id in txns],
+            )
+
+    def get_edges_between(self, node_ids, limit):
+        wanted = set(node_ids)
+        edges = []
+        with self._lock:
+            for label in ID_FIELDS:
+                for node_id in wanted:
+                    for rel_type, targets in self.outgoing.get((label, node_id), {}).items():
+                        for _, target_id in targets:
+                            if target_id in wanted:
+                                edges.append((node_id, target_id, rel_type))
+                                if len(edges) >= limit:
+                                    return edges
+        return edges
+
+    def get_neighbours(self, label, node_id):
+        with self._lock:
+            node = self.nodes[label].get(node_id)
+            if node is None:
+                return None
+            key = (label, node_id)
+            neighbours = []
+            for adjacency in (self.outgoing, self.incoming):
+                for rel_type, others in adjacency.get(key, {}).items():
+                    for other_label, other_id in others:
+                        other = self.nodes[other_label].get(other_id)
+                        if other is not None:
+                            neighbours.append((rel_type, other_label, dict(other)))
+            return dict(node), neighbours
+
+    def stream_nodes(self):
+        with self._lock:
+            nodes = [
+                (node_id, NODE_TYPES[label])
+                for label, nodes_by_id in self.nodes.items()
+                for node_id in nodes_by_id
+            ]
+        yield from nodes
+
+    def stream_edges(self, rel_types=None):
+        with self._lock:
+            edges = [
+                (source[1], target[1], rel_type)
+                for source, rel_type, target in self._edges()
+                if rel_types is None or rel_type in rel_types
+            ]
+        yield from edges
+
+    def attribute_counts(self, label, field):
+        with self._lock:
+            counts = [(value, len(ids)) for value, ids in self.indexes[(label, field)].items()]
+        yield from counts
+
+    def attribute_count(self, label, field, value):
+        with self._lock:
+            return len(self.indexes[(label, field)].get(value, ()))
+
+    def degree_counts(self, label):
+        with self._lock:
+            counts = []
+            for node_id in self.nodes[label]:
+                key = (label, node_id)
+                degrees = defaultdict(int)
+                for adjacency in (self.outgoing, self.incoming):
+                    for rel_type, others in adjacency.get(key, {}).items():
+                        degrees[rel_type] += len(others)
+                counts += [(node_id, rel_type, degree) for rel_type, degree in degrees.items() if degree]
+        yield from counts
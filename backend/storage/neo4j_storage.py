@@ -0,0 +1,257 @@
+import uuid
+
+from .base import GraphStorage, SHARED_ATTRIBUTES, ID_FIELDS
+
+UPSERT_USER_QUERY = """
+MERGE (u:User {user_id: $user_id})
+WITH u, properties(u) AS previous
+SET u.name = $name,
+    u.email = $email,
+    u.phone = $phone,
+    u.address = $address,
+    u.payment_method = $payment_method
+RETURN previous
+"""
+
+UPSERT_TRANSACTION_QUERY = """
+MERGE (t:Transaction {txn_id: $txn_id})
+WITH t, properties(t) AS previous
+SET t.amount = $amount,
+    t.device_id = $device_id,
+    t.ip_address = $ip_address
+WITH t, previous
+OPTIONAL MATCH (s:User {user_id: $sender_id})
+OPTIONAL MATCH (r:User {user_id: $receiver_id})
+CALL {
+    WITH t, s, r
+    WITH t, s, r WHERE s IS NOT NULL AND r IS NOT NULL
+    MERGE (s)-[sent:SENT]->(t)
+      ON CREATE SET sent.created_at = timestamp(), sent.created_by = $token
+    MERGE (t)-[received:RECEIVED_BY]->(r)
+      ON CREATE SET received.created_at = timestamp(), received.created_by = $token
+    RETURN collect(sent.created_by = $token) AS sent_created,
+           collect(received.created_by = $token) AS received_created
+}
+RETURN previous, sent_created, received_created
+"""
+
+CREDIT_QUERY = """
+MATCH (u:User {user_id: $id})-[:SENT]->(t:Transaction)-[:RECEIVED_BY]->(other:User)
+MERGE (u)-[r:CREDIT_TO]->(other)
+  ON CREATE SET r.created_at = timestamp(), r.created_by = $token
+RETURN DISTINCT other.user_id AS target_id, r.created_by = $token AS created
+"""
+
+DEBIT_QUERY = """
+MATCH (other:User)-[:SENT]->(t:Transaction)-[:RECEIVED_BY]->(u:User {user_id: $id})
+MERGE (u)-[r:DEBIT_FROM]->(other)
+  ON CREATE SET r.created_at = timestamp(), r.created_by = $token
+RETURN DISTINCT other.user_id AS target_id, r.created_by = $token AS created
+"""
+
+TRANSACTION_USER_LINKS_QUERY = """
+MATCH (s:User)-[:SENT]->(t:Transaction {txn_id: $txn_id})-[:RECEIVED_BY]->(r:User)
+MERGE (s)-[credit:CREDIT_TO]->(r)
+  ON CREATE SET credit.created_at = timestamp(), credit.created_by = $token
+MERGE (r)-[debit:DEBIT_FROM]->(s)
+  ON CREATE SET debit.created_at = timestamp(), debit.created_by = $token
+RETURN s.user_id AS sender_id, r.user_id AS receiver_id,
+       credit.created_by = $token AS credit_created,
+       debit.created_by = $token AS debit_created
+"""
+
+EDGES_BETWEEN_QUERY = """
+MATCH (n)-[r]->(m)
+WHERE ((n:User AND n.user_id IN $ids) OR (n:Transaction AND n.txn_id IN $ids))
+  AND ((m:User AND m.user_id IN $ids) OR (m:Transaction AND m.txn_id IN $ids))
+RETURN
+    CASE WHEN 'User' IN labels(n) THEN n.user_id ELSE n.txn_id END as source_id,
+    CASE WHEN 'User' IN labels(m) THEN m.user_id ELSE m.txn_id END as target_id,
+    type(r) as rel_type
+LIMIT $limit
+"""
+
+NODES_QUERY = """
+MATCH (u:User) RETURN u.user_id AS id, 'user' AS type
+UNION ALL
+MATCH (t:Transaction) RETURN t.txn_id AS id, 'transaction' AS type
+"""
+
+EDGES_QUERY = """
+MATCH (n)-[r]->(m)
+WHERE $relationship_types IS NULL OR type(r) IN $relationship_types
+RETURN
+    CASE WHEN 'User' IN labels(n) THEN n.user_id ELSE n.txn_id END AS source_id,
+    CASE WHEN 'User' IN labels(m) THEN m.user_id ELSE m.txn_id END AS target_id,
+    type(r) AS rel_type
+"""
+
+
+def _token():
+    """
+    Per-call marker stored on edges a MERGE creates (`created_by`), so creation
+    is reported exactly even when concurrent calls merge the same edge
+    """
+    return uuid.uuid4().hex
+
+
+def _shared_attribute_query(label, field, rel_type):
+    id_field = ID_FIELDS[label]
+    return f"""
+    MATCH (n1:{label} {{{id_field}: $id}}), (n2:{label})
+    WHERE n1 <> n2
+      AND n1.{field} IS NOT NULL
+      AND n1.{field} = n2.{field}
+    MERGE (n1)-[r:{rel_type}]->(n2)
+      ON CREATE SET r.created_at = timestamp(), r.created_by = $token
+    RETURN n2.{id_field} AS target_id, r.created_by = $token AS created
+    """
+
+
+SHARED_ATTRIBUTE_QUERIES = {
+    kind: _shared_attribute_query(label, field, rel_type)
+    for kind, (label, field, rel_type) in SHARED_ATTRIBUTES.items()
+}
+
+
+class Neo4jStorage(GraphStorage):
+    """Graph storage on Neo4j via Cypher."""
+
+    name = "neo4j"
+
+    def __init__(self, db):
+        self.db = db
+
+    # ---- lifecycle --------------------------------------------------------
+
+    def verify_connectivity(self):
+        self.db.verify_connectivity()
+
+    def bootstrap_schema(self):
+        return self.db.bootstrap_schema()
+
+    def close(self):
+        self.db.close()
+
+    def ping(self):
+        return bool(self.db.query("RETURN 1 AS test"))
+
+    def count_nodes(self):
+        result = self.db.query("MATCH (n) RETURN count(n) AS count")
+        return result[0]["count"] if result else 0
+
+    # ---- writes -----------------------------------------------------------
+
+    def upsert_user(self, user_data):
+        return self.db.query(UPSERT_USER_QUERY, user_data)[0]["previous"]
+
+    def upsert_transaction(self, txn_data):
+        record = self.db.query(UPSERT_TRANSACTION_QUERY, {**txn_data, "token": _token()})[0]
+        created = []
+        if any(record["sent_created"]):
+            created.append((txn_data["sender_id"], txn_data["txn_id"], "SENT"))
+        if any(record["received_created"]):
+            created.append((txn_data["txn_id"], txn_data["receiver_id"], "RECEIVED_BY"))
+        return record["previous"], created
+
+    def _merge_links(self, query, node_id, rel_type):
+        return [
+            (node_id, record["target_id"], rel_type, record["created"])
+            for record in self.db.query(query, {"id": node_id, "token": _token()})
+        ]
+
+    def link_user(self, user_id, skip=()):
+        links = []
+        for kind, (label, _, rel_type) in SHARED_ATTRIBUTES.items():
+            if label == "User" and kind not in skip:
+                links += self._merge_links(SHARED_ATTRIBUTE_QUERIES[kind], user_id, rel_type)
+        links += self._merge_links(CREDIT_QUERY, user_id, "CREDIT_TO")
+        links += self._merge_links(DEBIT_QUERY, user_id, "DEBIT_FROM")
+        return links
+
+    def link_transaction(self, txn_id, skip=()):
+        links = []
+        for kind, (label, _, rel_type) in SHARED_ATTRIBUTES.items():
+            if label == "Transaction" and kind not in skip:
+                links += self._merge_links(SHARED_ATTRIBUTE_QUERIES[kind], txn_id, rel_type)
+
+        for record in self.db.query(TRANSACTION_USER_LINKS_QUERY, {"txn_id": txn_id, "token": _token()}):
+            sender_id, receiver_id = record["sender_id"], record["receiver_id"]
+            links += [
+                (sender_id, txn_id, "SENT", False),
+                (txn_id, receiver_id, "RECEIVED_BY", False),
+                (sender_id, receiver_id, "CREDIT_TO", record["credit_created"]),
+                (receiver_id, sender_id, "DEBIT_FROM", record["debit_created"]),
+            ]
+        return links
+
+    # ---- reads ------------------------------------------------------------
+
+    def get_users(self, limit):
+        result = self.db.query("MATCH (u:User) RETURN u LIMIT $limit", {"limit": limit})
+        return [dict(record["u"]) for record in result]
+
+    def get_transactions(self, limit):
+        result = self.db.query("MATCH (t:Transaction) RETURN t LIMIT $limit", {"limit": limit})
+        return [dict(record["t"]) for record in result]
+
+    def get_nodes(self, node_ids):
+        params = {"ids": list(node_ids)}
+        users = self.db.query("MATCH (u:User) WHERE u.user_id IN $ids RETURN u", params)
+        txns = self.db.query("MATCH (t:Transaction) WHERE t.txn_id IN $ids RETURN t", params)
+        return [dict(record["u"]) for record in users], [dict(record["t"]) for record in txns]
+
+    def get_edges_between(self, node_ids, limit):
+        result = self.db.query(EDGES_BETWEEN_QUERY, {"ids": list(node_ids), "limit": limit})
+        return [(record["source_id"], record["target_id"], record["rel_type"]) for record in result]
+
+    def get_neighbours(self, label, node_id):
+        query = f"""
+        MATCH (n:{label} {{{ID_FIELDS[label]}: $id}})
+        OPTIONAL MATCH (n)-[r]-(connected)
+        RETURN n,
+               type(r) as relationship_type,
+               labels(connected) as connected_labels,
+               connected
+        """
+        result = self.db.query(query, {"id": node_id})
+        if not result:
+            return None
+
+        neighbours = []
+        for record in result:
+            if not record.get("connected"):
+                continue
+            labels = record.get("connected_labels") or []
+            neighbours.append((
+                record["relationship_type"],
+                labels[0] if labels else "Unknown",
+                dict(record["connected"]),
+            ))
+        return dict(result[0]["n"]), neighbours
+
+    def stream_nodes(self):
+        for record in self.db.stream(NODES_QUERY):
+            yield record["id"], record["type"]
+
+    def stream_edges(self, rel_types=None):
+        params = {"relationship_types": list(rel_types) if rel_types is not None else None}
+        for record in self.db.stream(EDGES_QUERY, params):
+            yield record["source_id"], record["target_id"], record["rel_type"]
+
+    def attribute_counts(self, label, field):
+        query = f"MATCH (n:{label}) WHERE n.{field} IS NOT NULL RETURN n.{field} AS value, count(*) AS count"
+        for record in self.db.stream(query):
+            yield record["value"], record["count"]
+
+    def attribute_count(self, label, field, value):
+        result = self.db.query(f"MATCH (n:{label} {{{field}: $value}}) RETURN count(n) AS count", {"value": value})
+        return result[0]["count"] if result else 0
+
+    def degree_counts(self, label):
+        query = (
+            f"MATCH (n:{label})-[r]-() "
+            f"RETURN n.{ID_FIELDS[label]} AS id, type(r) AS rel_type, count(*) AS degree"
+        )
+        for record in self.db.stream(query):
+            yield record["id"], record["rel_type"], record["degree"]
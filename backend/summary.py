@@ -0,0 +1,383 @@
+import heapq
+import os
+import threading
+from collections import Counter, deque
+
+from .storage import storage
+from .changes import changelog
+
+SHARED_RELATIONSHIPS = [
+    "SHARED_EMAIL", "SHARED_PHONE", "SHARED_ADDRESS",
+    "SHARED_PAYMENT_METHOD", "SHARED_DEVICE", "SHARED_IP",
+]
+
+# Summary mode -> relationship types it clusters over (None = all);
+# edges of other types are kept as inter-cluster edge weights
+SUMMARY_MODES = {
+    "component": None,
+    "shared": SHARED_RELATIONSHIPS,
+    "community": None,
+}
+
+# Safety cap on label propagation updates, per node in the graph
+MAX_PROPAGATION_ROUNDS = 20
+
+TYPE_COUNTERS = {"user": "users", "transaction": "transactions"}
+
+# How long the follower waits for a write before re-checking it was not stopped,
+# and how long it backs off after a failed refresh
+SUMMARY_POLL_SECONDS = float(os.getenv("SUMMARY_POLL_SECONDS", "1.0"))
+SUMMARY_RETRY_SECONDS = float(os.getenv("SUMMARY_RETRY_SECONDS", "30"))
+
+# Per-mode clustering state, swapped in wholesale after a full load
+STATE_FIELDS = ("node_types", "parent", "adjacency", "labels", "edge_count", "clusters", "members", "links")
+
+
+def _new_cluster():
+    return {"size": 0, "users": 0, "transactions": 0, "internal_edges": 0}
+
+
+class SummaryLoading(Exception):
+    """Raised when a summary is read before its first full load has finished."""
+
+
+class GraphSummary:
+    """
+    Cached clustering of the whole graph into super-nodes.
+
+    A background follower (see `start`) streams every node and edge from
+    storage once, then applies the change feed as writes happen, so reads
+    only serve the cached state and never touch storage. The feed carries
+    newly created edges only, so edges are folded in without keeping a
+    copy of them. If the follower falls behind the retained feed it
+    rebuilds off to the side while reads keep serving the previous state.
+
+    `component` and `shared` modes use union-find (connected components
+    over all / shared-attribute relationships; in `shared` mode the other
+    edges become inter-cluster weights); `community` runs queue-based
+    label propagation seeded from the previous labels so only the
+    neighbourhood of new edges is revisited, and is the only mode that
+    keeps adjacency. Per-cluster counts, members and inter-cluster edge
+    weights are updated on every union or label change.
+
+    Edges created while the full load is streaming may be counted twice
+    in edge totals; cluster membership is unaffected.
+    """
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.relationship_types = SUMMARY_MODES[mode]
+        # Guards the clustering state; held briefly by reads and delta applies
+        self._lock = threading.Lock()
+        # One refresh (delta apply or full load) at a time
+        self._refresh_lock = threading.Lock()
+        self._follower = None
+        self._stopped = threading.Event()
+        self.version = None
+        self._reset_state()
+
+    def _reset_state(self):
+        self.node_types = {}
+        self.parent = {}
+        self.adjacency = {}
+        self.labels = {}
+        self.edge_count = 0
+        # Cluster id -> counts, member ids, and other cluster id -> edge weight
+        self.clusters = {}
+        self.members = {}
+        self.links = {}
+
+    # ---- refresh ----------------------------------------------------------
+
+    def start(self):
+        """Start following the change feed in a daemon thread; later calls are free."""
+        with self._lock:
+            if self._follower is None and not self._stopped.is_set():
+                self._follower = threading.Thread(target=self._follow, name=f"summary-{self.mode}", daemon=True)
+                self._follower.start()
+
+    def stop(self):
+        """Stop the follower after its current refresh."""
+        self._stopped.set()
+
+    def _follow(self):
+        while not self._stopped.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"⚠ Summary '{self.mode}' refresh failed, retrying in {SUMMARY_RETRY_SECONDS:g}s: {e}")
+                self._stopped.wait(SUMMARY_RETRY_SECONDS)
+                continue
+            changelog.wait_for_change(self.version, timeout=SUMMARY_POLL_SECONDS)
+
+    def refresh(self):
+        """Bring the cached clustering up to the current change-feed version, blocking until done."""
+        with self._refresh_lock:
+            if self.version is None:
+                self._full_load()
+            elif changelog.version != self.version:
+                changes = changelog.changes_since(self.version)
+                if changes["reset"]:
+                    self._full_load()
+                else:
+                    with self._lock:
+                        self._apply_changes(changes)
+
+    def _full_load(self):
+        # Built off to the side so reads keep serving the previous clustering meanwhile
+        fresh = GraphSummary(self.mode)
+        # Taken before reading so writes racing the load are re-applied, not lost
+        fresh.version = changelog.version
+
+        for node_id, node_type in storage.stream_nodes():
+            fresh._add_node(node_id, node_type)
+
+        for source_id, target_id, rel_type in storage.stream_edges():
+            fresh._add_edge(source_id, target_id, rel_type)
+
+        if self.mode == "community":
+            fresh._propagate_labels(set(fresh.node_types))
+
+        with self._lock:
+            for field in STATE_FIELDS:
+                setattr(self, field, getattr(fresh, field))
+            self.version = fresh.version
+
+    def _apply_changes(self, changes):
+        touched = set()
+        for node in changes["nodes"]:
+            self._add_node(node["data"]["id"], node["data"]["type"])
+            touched.add(node["data"]["id"])
+        for edge in changes["edges"]:
+            data = edge["data"]
+            if self._add_edge(data["source"], data["target"], data["type"]):
+                touched.update((data["source"], data["target"]))
+
+        if self.mode == "community":
+            self._propagate_labels(touched)
+        self.version = changes["version"]
+
+    def _add_node(self, node_id, node_type):
+        if node_id is None:
+            return
+        previous_type = self.node_types.get(node_id)
+        if previous_type == node_type:
+            return
+
+        if previous_type is None:
+            if self.mode == "community":
+                self.labels[node_id] = node_id
+                self.adjacency[node_id] = Counter()
+                self.members[node_id] = {node_id}
+            else:
+                self.parent[node_id] = node_id
+                self.members[node_id] = [node_id]
+            self.clusters[node_id] = _new_cluster()
+            self.clusters[node_id]["size"] = 1
+        self.node_types[node_id] = node_type
+
+        cluster = self.clusters[self.cluster_of(node_id)]
+        if previous_type in TYPE_COUNTERS:
+            cluster[TYPE_COUNTERS[previous_type]] -= 1
+        if node_type in TYPE_COUNTERS:
+            cluster[TYPE_COUNTERS[node_type]] += 1
+
+    def _add_edge(self, source_id, target_id, rel_type):
+        """Fold one newly created edge into the clustering."""
+        if source_id is None or target_id is None:
+            return False
+        for node_id in (source_id, target_id):
+            if node_id not in self.node_types:
+                self._add_node(node_id, "unknown")
+
+        self.edge_count += 1
+        if self.mode == "community":
+            self.adjacency[source_id][target_id] += 1
+            if target_id != source_id:
+                self.adjacency[target_id][source_id] += 1
+            self._link(self.labels[source_id], self.labels[target_id], 1)
+        elif self.relationship_types is None or rel_type in self.relationship_types:
+            self._union(source_id, target_id)
+            self.clusters[self._find(source_id)]["internal_edges"] += 1
+        else:
+            # Not clustered over, but kept as an edge weight between the clusters
+            self._link(self._find(source_id), self._find(target_id), 1)
+        return True
+
+    def _link(self, cluster_a, cluster_b, weight):
+        """Count `weight` edges between two clusters (internal when they are the same)."""
+        if cluster_a == cluster_b:
+            self.clusters[cluster_a]["internal_edges"] += weight
+            return
+        for cluster, other in ((cluster_a, cluster_b), (cluster_b, cluster_a)):
+            links = self.links.setdefault(cluster, Counter())
+            links[other] += weight
+            if links[other] <= 0:
+                del links[other]
+                if not links:
+                    del self.links[cluster]
+
+    # ---- clustering -------------------------------------------------------
+
+    def _find(self, node_id):
+        root = node_id
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[node_id] != root:
+            self.parent[node_id], node_id = root, self.parent[node_id]
+        return root
+
+    def _union(self, a, b):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a == root_b:
+            return
+        # Smallest id wins so cluster ids stay stable across refreshes
+        if root_b < root_a:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+
+        merged, absorbed = self.clusters[root_a], self.clusters.pop(root_b)
+        for key, count in absorbed.items():
+            merged[key] += count
+
+        # Extend the larger member list so merging stays O(n log n) overall
+        kept, moved = self.members[root_a], self.members.pop(root_b)
+        if len(moved) > len(kept):
+            kept, moved = moved, kept
+            self.members[root_a] = kept
+        kept.extend(moved)
+
+        # Re-point the absorbed cluster's edge weights; weight between the two becomes internal
+        for other, weight in self.links.pop(root_b, {}).items():
+            back = self.links[other]
+            del back[root_b]
+            if not back:
+                del self.links[other]
+            self._link(root_a, other, weight)
+
+    def _relabel(self, node_id, label):
+        """Move a node to another community, carrying its counts and edge weights."""
+        old_label = self.labels[node_id]
+        for neighbour, weight in self.adjacency[node_id].items():
+            if neighbour == node_id:
+                # A self-loop moves with the node
+                self._link(old_label, old_label, -weight)
+                self._link(label, label, weight)
+                continue
+            neighbour_label = self.labels[neighbour]
+            self._link(old_label, neighbour_label, -weight)
+            self._link(label, neighbour_label, weight)
+
+        old_cluster = self.clusters[old_label]
+        new_cluster = self.clusters.setdefault(label, _new_cluster())
+        type_counter = TYPE_COUNTERS.get(self.node_types[node_id])
+        for cluster, delta in ((old_cluster, -1), (new_cluster, 1)):
+            cluster["size"] += delta
+            if type_counter:
+                cluster[type_counter] += delta
+
+        self.members[old_label].discard(node_id)
+        self.members.setdefault(label, set()).add(node_id)
+        if old_cluster["size"] == 0:
+            del self.clusters[old_label]
+            del self.members[old_label]
+        self.labels[node_id] = label
+
+    def _propagate_labels(self, seeds):
+        queue = deque(sorted(seeds))
+        queued = set(queue)
+        budget = MAX_PROPAGATION_ROUNDS * len(self.node_types)
+
+        while queue and budget > 0:
+            budget -= 1
+            node_id = queue.popleft()
+            queued.discard(node_id)
+            neighbours = self.adjacency[node_id]
+            if not neighbours:
+                continue
+
+            weights = Counter()
+            for neighbour, weight in neighbours.items():
+                weights[self.labels[neighbour]] += weight
+            best = max(weights.values())
+            current = self.labels[node_id]
+            if weights.get(current) == best:
+                continue
+
+            self._relabel(node_id, min(label for label, w in weights.items() if w == best))
+            for neighbour in neighbours:
+                if neighbour not in queued:
+                    queued.add(neighbour)
+                    queue.append(neighbour)
+
+    def cluster_of(self, node_id):
+        if self.mode == "community":
+            return self.labels[node_id]
+        return self._find(node_id)
+
+    # ---- results ----------------------------------------------------------
+
+    def get_summary(self, limit=200):
+        """Largest clusters as graph super-nodes, with inter-cluster edge weights."""
+        with self._lock:
+            self._check_loaded()
+            top = heapq.nsmallest(
+                limit, self.clusters.items(), key=lambda item: (-item[1]["size"], item[0])
+            )
+            shown = {cluster_id for cluster_id, _ in top}
+
+            nodes = [
+                {
+                    "data": {
+                        "id": cluster_id,
+                        "label": f"{stats['size']} nodes",
+                        "type": "cluster",
+                        **stats
+                    }
+                }
+                for cluster_id, stats in top
+            ]
+            edges = [
+                {
+                    "data": {
+                        "id": f"{source}-CLUSTER_LINK-{target}",
+                        "source": source,
+                        "target": target,
+                        "type": "CLUSTER_LINK",
+                        "weight": weight
+                    }
+                }
+                for source, _ in top
+                for target, weight in self.links.get(source, {}).items()
+                if source < target and target in shown
+            ]
+
+            return {
+                "mode": self.mode,
+                "version": self.version,
+                "total_nodes": len(self.node_types),
+                "total_edges": self.edge_count,
+                "cluster_count": len(self.clusters),
+                "nodes": nodes,
+                "edges": edges,
+            }
+
+    def get_members(self, cluster_id, limit=500):
+        """Member node ids of one cluster, or None if it does not exist."""
+        with self._lock:
+            self._check_loaded()
+            if cluster_id not in self.clusters:
+                return None
+            return {
+                "cluster_id": cluster_id,
+                "version": self.version,
+                **self.clusters[cluster_id],
+                "members": heapq.nsmallest(limit, self.members[cluster_id]),
+            }
+
+    def _check_loaded(self):
+        if self.version is None:
+            raise SummaryLoading(self.mode)
+
+
+summaries = {mode: GraphSummary(mode) for mode in SUMMARY_MODES}
@@ -0,0 +1,119 @@
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+# Sliding windows tracked for every key: name -> (window seconds, ring-buffer buckets)
+WINDOWS = {
+    "1m": (60, 12),              # 5 second buckets
+    "1h": (60 * 60, 12),         # 5 minute buckets
+    "24h": (24 * 60 * 60, 24),   # 1 hour buckets
+}
+
+# Velocity kind -> transaction field it is keyed on
+KINDS = {
+    "device": "device_id",
+    "ip": "ip_address",
+    "user": "sender_id",
+}
+
+# Least recently used keys are evicted past this many per kind (~1 KB per key)
+MAX_KEYS_PER_KIND = int(os.getenv("VELOCITY_MAX_KEYS", "50000"))
+
+
+def _build_layout():
+    """Window name -> (first slot in a key's arrays, number of buckets, bucket width in seconds)"""
+    layout, offset = {}, 0
+    for name, (seconds, num_buckets) in WINDOWS.items():
+        layout[name] = (offset, num_buckets, seconds / num_buckets)
+        offset += num_buckets
+    return layout, offset
+
+
+_LAYOUT, SLOTS_PER_KEY = _build_layout()
+
+
+class KeyCounters:
+    """
+    Ring buffers of time buckets for every window of a single key, packed
+    into two flat arrays. Each slot remembers which bucket epoch it holds,
+    so stale slots are reset lazily on write and ignored on read - no
+    background sweeping.
+    """
+
+    __slots__ = ("counts", "epochs")
+
+    def __init__(self):
+        self.counts = array("l", [0]) * SLOTS_PER_KEY
+        self.epochs = array("l", [-1]) * SLOTS_PER_KEY
+
+    def add(self, now, amount=1):
+        for offset, num_buckets, bucket_width in _LAYOUT.values():
+            epoch = int(now // bucket_width)
+            slot = offset + epoch % num_buckets
+            if self.epochs[slot] != epoch:
+                self.epochs[slot] = epoch
+                self.counts[slot] = 0
+            self.counts[slot] += amount
+
+    def totals(self, now):
+        result = {}
+        for name, (offset, num_buckets, bucket_width) in _LAYOUT.items():
+            epoch = int(now // bucket_width)
+            oldest = epoch - num_buckets + 1
+            result[name] = sum(
+                self.counts[slot]
+                for slot in range(offset, offset + num_buckets)
+                if oldest <= self.epochs[slot] <= epoch
+            )
+        return result
+
+
+class VelocityTracker:
+    """In-process transaction counters per device, IP and sending user."""
+
+    def __init__(self, max_keys_per_kind=MAX_KEYS_PER_KIND, clock=time.time):
+        self.max_keys_per_kind = max_keys_per_kind
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._counters = {kind: OrderedDict() for kind in KINDS}
+
+    def record_transaction(self, txn_data, now=None):
+        """Count one transaction against each of its device, IP and sender keys."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            for kind, field in KINDS.items():
+                key = txn_data.get(field)
+                if key is None:
+                    continue
+                self._get_or_create(kind, key).add(now)
+
+    def get_counts(self, kind, key, now=None):
+        """Return the number of transactions seen for a key in every window."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            counters = self._counters[kind].get(key)
+            if counters is None:
+                return {name: 0 for name in WINDOWS}
+            return counters.totals(now)
+
+    def reset(self):
+        with self._lock:
+            for counters in self._counters.values():
+                counters.clear()
+
+    def _get_or_create(self, kind, key):
+        counters_by_key = self._counters[kind]
+        counters = counters_by_key.get(key)
+        if counters is None:
+            counters = KeyCounters()
+            counters_by_key[key] = counters
+            if len(counters_by_key) > self.max_keys_per_kind:
+                counters_by_key.popitem(last=False)
+        else:
+            counters_by_key.move_to_end(key)
+        return counters
+
+
+velocity = VelocityTracker()
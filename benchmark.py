@@ -0,0 +1,211 @@
+"""
+Startup, ingest and read-latency benchmark
+Starts the API in a fresh process per storage backend, measures cold start
+until the first request is served, ingests an identical seeded workload and
+times the main read endpoints
+Run from the repository root: python benchmark.py (embedded memory engine)
+Compare backends against a disposable Neo4j database (never the app's NEO4J_URI):
+    BENCH_NEO4J_URI=bolt://localhost:7688 BENCH_NEO4J_PASSWORD=... BENCH_BACKENDS=neo4j,memory python benchmark.py
+Every id and attribute value carries a per-run prefix, so the workload never
+links to existing records, and the run's nodes are deleted afterwards
+"""
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import requests
+
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+API_URL = f"http://127.0.0.1:{PORT}"
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "20"))
+STARTUP_TIMEOUT = 60
+BACKENDS = os.getenv("BENCH_BACKENDS", "memory").split(",")
+NUM_USERS = int(os.getenv("BENCH_USERS", "50"))
+NUM_TRANSACTIONS = int(os.getenv("BENCH_TRANSACTIONS", "500"))
+
+# Neo4j is only benchmarked against a database named explicitly for it
+BENCH_NEO4J_URI = os.getenv("BENCH_NEO4J_URI")
+BENCH_NEO4J_USER = os.getenv("BENCH_NEO4J_USER", "neo4j")
+BENCH_NEO4J_PASSWORD = os.getenv("BENCH_NEO4J_PASSWORD", "password")
+
+# Unique per run: a re-run ingests new records instead of re-posting the last run's
+PREFIX = f"bench_{uuid.uuid4().hex[:8]}_"
+
+CLEANUP_QUERY = """
+MATCH (n)
+WHERE n.user_id STARTS WITH $prefix OR n.txn_id STARTS WITH $prefix
+DETACH DELETE n
+"""
+
+
+def endpoints():
+    return [
+        "/health",
+        "/users",
+        "/transactions",
+        "/graph",
+        "/graph/changes?since=0",
+        "/stats/top?kind=ip&by=degree&n=100",
+        f"/velocity/ip/{PREFIX}ip_1",
+        f"/relationships/user/{PREFIX}user_0001",
+        f"/relationships/transaction/{PREFIX}txn_00001",
+        "/app.js",
+    ]
+
+
+def generate_workload():
+    """
+    Same seeded users and transactions for every backend, with shared attributes.
+    Attribute values are prefixed too, so nothing is shared with existing records
+    """
+    rng = random.Random(42)
+    users = [
+        {
+            "user_id": f"{PREFIX}user_{i:04d}",
+            "name": f"Bench User {i}",
+            "email": f"{PREFIX}shared{rng.randrange(10)}@example.test" if i % 3 == 0
+            else f"{PREFIX}user{i}@example.test",
+            "phone": f"{PREFIX}phone_{rng.randrange(20):04d}",
+            "address": f"{PREFIX}address_{rng.randrange(15)}",
+            "payment_method": f"{PREFIX}{rng.choice(['card', 'transfer', 'wallet'])}",
+        }
+        for i in range(1, NUM_USERS + 1)
+    ]
+    transactions = []
+    for i in range(1, NUM_TRANSACTIONS + 1):
+        sender, receiver = rng.sample(users, 2)
+        transactions.append({
+            "txn_id": f"{PREFIX}txn_{i:05d}",
+            "sender_id": sender["user_id"],
+            "receiver_id": receiver["user_id"],
+            "amount": round(rng.uniform(1, 10000), 2),
+            "device_id": f"{PREFIX}device_{rng.randrange(50)}",
+            "ip_address": f"{PREFIX}ip_{rng.randrange(30)}",
+        })
+    return users, transactions
+
+
+def measure_ingest(users, transactions):
+    """POST the workload sequentially; returns (records per second, failures)"""
+    failures = 0
+    started = time.perf_counter()
+    for endpoint, items in (("users", users), ("transactions", transactions)):
+        for item in items:
+            response = requests.post(f"{API_URL}/{endpoint}", json=item, timeout=30)
+            if response.status_code not in (200, 201):
+                failures += 1
+    elapsed = time.perf_counter() - started
+    return (len(users) + len(transactions)) / elapsed, failures
+
+
+def server_env(backend):
+    env = {**os.environ, "STORAGE_BACKEND": backend}
+    if backend == "neo4j":
+        # Set explicitly so the server's load_dotenv() cannot point it at the .env database
+        env.update(NEO4J_URI=BENCH_NEO4J_URI, NEO4J_USER=BENCH_NEO4J_USER, NEO4J_PASSWORD=BENCH_NEO4J_PASSWORD)
+    return env
+
+
+def delete_workload(backend):
+    """Remove this run's nodes; the memory engine goes away with its process"""
+    if backend != "neo4j":
+        return
+    from backend.database import Neo4jConnection
+
+    db = Neo4jConnection(BENCH_NEO4J_URI, BENCH_NEO4J_USER, BENCH_NEO4J_PASSWORD)
+    try:
+        db.query(CLEANUP_QUERY, {"prefix": PREFIX})
+        print(f"\n🧹 Deleted nodes prefixed {PREFIX}")
+    finally:
+        db.close()
+
+
+def measure_cold_start(backend):
+    """Spawn the server and poll until it answers; returns (process, seconds)"""
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(PORT), "--log-level", "warning"],
+        env=server_env(backend)
+    )
+    while time.perf_counter() - started < STARTUP_TIMEOUT:
+        try:
+            requests.get(f"{API_URL}/health", timeout=1)
+            return server, time.perf_counter() - started
+        except requests.exceptions.ConnectionError:
+            time.sleep(0.01)
+    server.terminate()
+    raise RuntimeError(f"Server did not answer within {STARTUP_TIMEOUT}s")
+
+
+def measure_endpoint(path):
+    """Return per-request latencies in milliseconds, or the first non-2xx/304 status code"""
+    latencies = []
+    for _ in range(ITERATIONS):
+        started = time.perf_counter()
+        response = requests.get(f"{API_URL}{path}", timeout=30)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if not (200 <= response.status_code < 300 or response.status_code == 304):
+            return response.status_code
+    return latencies
+
+
+def run_backend(backend, users, transactions):
+    print(f"\n{'=' * 60}")
+    print(f"  STORAGE BACKEND: {backend}")
+    print("=" * 60)
+
+    server, cold_start = measure_cold_start(backend)
+    try:
+        health = requests.get(f"{API_URL}/health", timeout=30).json()
+        startup = health.get("startup", {})
+
+        print(f"\n🚀 Cold start")
+        print(f"  Process spawn → first request served: {cold_start * 1000:.0f} ms")
+        if startup.get("ready_seconds") is not None:
+            print(f"  Import → ready (in process):          {startup['ready_seconds'] * 1000:.0f} ms")
+        if startup.get("first_request_seconds") is not None:
+            print(f"  Import → first request (in process):  {startup['first_request_seconds'] * 1000:.0f} ms")
+        print(f"  Database warm-up: {startup.get('warmup', 'unknown')}")
+
+        rate, failures = measure_ingest(users, transactions)
+        print(f"\n📥 Ingest ({len(users):,} users + {len(transactions):,} transactions)")
+        print(f"  {rate:.0f} records/sec, {failures} failed")
+
+        print(f"\n⏱  Read latency ({ITERATIONS} requests each)")
+        print(f"  {'Endpoint':<56}{'p50 ms':>10}{'p95 ms':>10}")
+        for path in endpoints():
+            result = measure_endpoint(path)
+            if isinstance(result, int):
+                print(f"  {path:<56}{'HTTP ' + str(result):>20}")
+                continue
+            result.sort()
+            p95 = result[min(len(result) - 1, int(len(result) * 0.95))]
+            print(f"  {path:<56}{statistics.median(result):>10.1f}{p95:>10.1f}")
+    finally:
+        server.terminate()
+        server.wait()
+        delete_workload(backend)
+
+
+def main():
+    backends = [backend.strip() for backend in BACKENDS]
+    if "neo4j" in backends and not BENCH_NEO4J_URI:
+        sys.exit("Benchmarking Neo4j writes to the database: set BENCH_NEO4J_URI to a disposable one")
+
+    print("=" * 60)
+    print("  BENCHMARK")
+    print("=" * 60)
+
+    users, transactions = generate_workload()
+    for backend in backends:
+        run_backend(backend, users, transactions)
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
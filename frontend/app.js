@@ -6,6 +6,14 @@ let allGraphData = { nodes: [], edges: [] }; // Store all data
 let users = [];
 let transactions = [];
 let currentView = 'transactions'; // 'transactions' or 'fraud'
+let graphVersion = null; // Change-feed version the loaded graph reflects
+let graphEpoch = null; // Server process that issued graphVersion
+let changeStream = null; // EventSource for live graph changes
+
+// Live updates patch what is loaded but never grow it past the /graph, /users and /transactions caps
+const MAX_GRAPH_NODES = 700;
+const MAX_GRAPH_EDGES = 2000;
+const MAX_LIST_ITEMS = 200;
 
 // Relationship type colors
 const edgeColors = {
@@ -164,6 +172,8 @@ async function loadGraph() {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         allGraphData = await response.json();
+        graphVersion = allGraphData.version ?? null;
+        graphEpoch = allGraphData.epoch ?? null;
         console.log('Graph data loaded:', allGraphData.nodes.length, 'nodes,', allGraphData.edges.length, 'edges');
         
         // Fetch users and transactions for sidebar
@@ -185,6 +195,7 @@ async function loadGraph() {
         switchView(currentView);
         renderLists();
         updateStats();
+        startChangeStream();
         
         document.getElementById('loading').style.display = 'none';
     } catch (error) {
@@ -216,63 +227,68 @@ function switchView(view) {
         fraudBtn.style.background = view === 'fraud' ? '#667eea' : '#94a3b8';
     }
     
-    // Filter edges based on view
-    const fraudRelationships = ['SHARED_EMAIL', 'SHARED_PHONE', 'SHARED_ADDRESS', 
-                                'SHARED_PAYMENT_METHOD', 'SHARED_DEVICE', 'SHARED_IP'];
-    const transactionRelationships = ['SENT', 'RECEIVED_BY'];
-    
-    if (view === 'transactions') {
-        // Show only transaction flow
-        graphData = {
-            nodes: allGraphData.nodes,
-            edges: allGraphData.edges.filter(e => transactionRelationships.includes(e.data.type))
-        };
-    } else {
-        // Show only fraud detection relationships (shared attributes)
-        graphData = {
-            nodes: allGraphData.nodes.filter(n => n.data.type === 'user'), // Only users for fraud view
-            edges: allGraphData.edges.filter(e => fraudRelationships.includes(e.data.type))
-        };
-    }
+    // Filter nodes and edges based on view
+    graphData = {
+        nodes: allGraphData.nodes.filter(nodeInView),
+        edges: allGraphData.edges.filter(edgeInView)
+    };
     
     console.log(`Switched to ${view} view:`, graphData.nodes.length, 'nodes,', graphData.edges.length, 'edges');
     processGraphData();
 }
 
+const fraudRelationships = ['SHARED_EMAIL', 'SHARED_PHONE', 'SHARED_ADDRESS', 
+                            'SHARED_PAYMENT_METHOD', 'SHARED_DEVICE', 'SHARED_IP'];
+const transactionRelationships = ['SENT', 'RECEIVED_BY'];
+
+// Transaction view shows every node; fraud view only users
+function nodeInView(node) {
+    return currentView === 'transactions' || node.data.type === 'user';
+}
+
+// Transaction view shows money flow; fraud view shared attributes
+function edgeInView(edge) {
+    const relationships = currentView === 'transactions' ? transactionRelationships : fraudRelationships;
+    return relationships.includes(edge.data.type);
+}
+
+// Convert an API node into a Cytoscape element
+function toCyNode(node) {
+    const nodeData = node.data;
+    return {
+        group: 'nodes',
+        data: {
+            id: nodeData.id,
+            label: nodeData.label,
+            type: nodeData.type,
+            color: nodeData.type === 'user' ? '#667eea' : '#f59e0b',
+            size: nodeData.type === 'user' ? 50 : 40,
+            ...nodeData
+        }
+    };
+}
+
+// Convert an API edge into a Cytoscape element
+function toCyEdge(edge) {
+    const edgeData = edge.data;
+    return {
+        group: 'edges',
+        data: {
+            id: edgeData.id,
+            source: edgeData.source,
+            target: edgeData.target,
+            type: edgeData.type,
+            color: edgeColors[edgeData.type] || '#94a3b8'
+        }
+    };
+}
+
 // Process graph data for Cytoscape
 function processGraphData() {
-    const elements = [];
-    
-    // Add nodes
-    graphData.nodes.forEach(node => {
-        const nodeData = node.data;
-        elements.push({
-            group: 'nodes',
-            data: {
-                id: nodeData.id,
-                label: nodeData.label,
-                type: nodeData.type,
-                color: nodeData.type === 'user' ? '#667eea' : '#f59e0b',
-                size: nodeData.type === 'user' ? 50 : 40,
-                ...nodeData
-            }
-        });
-    });
-    
-    // Add edges
-    graphData.edges.forEach(edge => {
-        const edgeData = edge.data;
-        elements.push({
-            group: 'edges',
-            data: {
-                id: edgeData.id,
-                source: edgeData.source,
-                target: edgeData.target,
-                type: edgeData.type,
-                color: edgeColors[edgeData.type] || '#94a3b8'
-            }
-        });
-    });
+    const elements = [
+        ...graphData.nodes.map(toCyNode),
+        ...graphData.edges.map(toCyEdge)
+    ];
     
     // Update graph
     cy.elements().remove();
@@ -289,6 +305,134 @@ function processGraphData() {
     }).run();
 }
 
+// Versions are only comparable within one server process, so the epoch is always sent along
+function changeFeedQuery() {
+    const params = new URLSearchParams({ since: graphVersion });
+    if (graphEpoch !== null) {
+        params.set('epoch', graphEpoch);
+    }
+    return params.toString();
+}
+
+// Subscribe to server-sent graph changes from the loaded version
+function startChangeStream() {
+    if (changeStream) {
+        changeStream.close();
+        changeStream = null;
+    }
+    if (graphVersion === null || typeof EventSource === 'undefined') {
+        return;
+    }
+    
+    changeStream = new EventSource(`${API_URL}/graph/stream?${changeFeedQuery()}`);
+    changeStream.onmessage = function(evt) {
+        applyGraphChanges(JSON.parse(evt.data));
+    };
+    changeStream.onerror = function() {
+        console.warn('Graph change stream interrupted, reconnecting...');
+    };
+}
+
+// Fetch only what changed since the loaded version
+async function refreshGraph() {
+    if (graphVersion === null) {
+        return loadGraph();
+    }
+    
+    try {
+        const response = await fetch(`${API_URL}/graph/changes?${changeFeedQuery()}`);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        applyGraphChanges(await response.json());
+    } catch (error) {
+        console.error('Error refreshing graph:', error);
+    }
+}
+
+// Replace items whose key is already in `list`; append new ones while under `limit`
+function upsertBounded(list, items, keyOf, limit) {
+    const index = new Map(list.map((item, i) => [keyOf(item), i]));
+    items.forEach(item => {
+        const key = keyOf(item);
+        if (index.has(key)) {
+            list[index.get(key)] = item;
+        } else if (list.length < limit) {
+            index.set(key, list.length);
+            list.push(item);
+        }
+    });
+}
+
+// Patch loaded data and the Cytoscape instance with a change-feed delta
+function applyGraphChanges(changes) {
+    if (changes.reset) {
+        console.log('Graph change feed reset, reloading full graph');
+        loadGraph();
+        return;
+    }
+    if (changes.version <= graphVersion) {
+        return;
+    }
+    graphVersion = changes.version;
+    
+    // Patch known nodes; new ones are only taken while under the cap
+    upsertBounded(allGraphData.nodes, changes.nodes, node => node.data.id, MAX_GRAPH_NODES);
+    const loaded = new Set(allGraphData.nodes.map(node => node.data.id));
+    const loadedEdges = changes.edges.filter(edge =>
+        loaded.has(edge.data.source) && loaded.has(edge.data.target)
+    );
+    upsertBounded(allGraphData.edges, loadedEdges, edge => edge.data.id, MAX_GRAPH_EDGES);
+    
+    // Keep sidebar lists in sync
+    const changedUsers = [];
+    const changedTransactions = [];
+    changes.nodes.forEach(node => {
+        const { id, label, type, ...record } = node.data;
+        (type === 'user' ? changedUsers : changedTransactions).push(record);
+    });
+    upsertBounded(users, changedUsers, user => user.user_id, MAX_LIST_ITEMS);
+    upsertBounded(transactions, changedTransactions, txn => txn.txn_id, MAX_LIST_ITEMS);
+    
+    // Patch visible elements in place; only nodes kept above are added
+    const added = [];
+    changes.nodes.filter(node => loaded.has(node.data.id) && nodeInView(node)).forEach(node => {
+        const element = toCyNode(node);
+        const existing = cy.getElementById(element.data.id);
+        if (existing.length > 0) {
+            existing.data(element.data);
+        } else {
+            added.push(element);
+        }
+    });
+    cy.add(added);
+    
+    const addedEdges = loadedEdges.filter(edgeInView).map(toCyEdge).filter(element =>
+        cy.getElementById(element.data.id).length === 0 &&
+        cy.getElementById(element.data.source).length > 0 &&
+        cy.getElementById(element.data.target).length > 0
+    );
+    cy.add(addedEdges);
+    
+    graphData = {
+        nodes: allGraphData.nodes.filter(nodeInView),
+        edges: allGraphData.edges.filter(edgeInView)
+    };
+    
+    if (added.length > 0) {
+        cy.layout({
+            name: 'cose',
+            animate: true,
+            animationDuration: 500,
+            randomize: false,
+            fit: false
+        }).run();
+    }
+    
+    renderLists();
+    updateStats();
+}
+
 // Render sidebar lists
 function renderLists() {
     const usersList = document.getElementById('usersList');
@@ -64,6 +64,7 @@ else:
 BATCH_SIZE = 1000  # Process in batches
 MAX_WORKERS = 20   # Parallel requests (balanced for Railway)
 TIMEOUT = 30       # Increased timeout for Railway cold starts
+MAX_RETRIES = 5    # Retries when the API sheds load with 429
 
 print(f"\n📊 Configuration:")
 print(f"  Users: {NUM_USERS:,}")
@@ -72,6 +73,14 @@ print(f"  Total nodes: {NUM_USERS + NUM_TRANSACTIONS:,}")
 print(f"  Batch size: {BATCH_SIZE:,}")
 print(f"  Parallel workers: {MAX_WORKERS}")
 
+def post_with_retry(url, json):
+    """POST, backing off for Retry-After seconds whenever the API answers 429"""
+    for attempt in range(MAX_RETRIES + 1):
+        response = requests.post(url, json=json, timeout=TIMEOUT)
+        if response.status_code != 429 or attempt == MAX_RETRIES:
+            return response
+        time.sleep(float(response.headers.get("Retry-After", 1)) * (attempt + 1))
+
 # Generate user pool
 def generate_users():
     """Generate 100 users with intentional shared attributes using Faker"""
@@ -132,7 +141,7 @@ def send_batch(endpoint, data_batch, batch_num, total_batches):
     
     for item in data_batch:
         try:
-            response = requests.post(f"{API_URL}/{endpoint}", json=item, timeout=TIMEOUT)
+            response = post_with_retry(f"{API_URL}/{endpoint}", item)
             if response.status_code in (200, 201):
                 success_count += 1
             else:
@@ -177,7 +186,7 @@ def main():
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         futures = []
         for user in users:
-            future = executor.submit(requests.post, f"{API_URL}/users", json=user, timeout=TIMEOUT)
+            future = executor.submit(post_with_retry, f"{API_URL}/users", user)
             futures.append(future)
         
         for i, future in enumerate(as_completed(futures), 1):
@@ -225,7 +234,7 @@ def main():
         with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
             futures = []
             for txn in transactions:
-                future = executor.submit(requests.post, f"{API_URL}/transactions", json=txn, timeout=TIMEOUT)
+                future = executor.submit(post_with_retry, f"{API_URL}/transactions", txn)
                 futures.append(future)
             
             batch_success = 0
@@ -0,0 +1,127 @@
+"""
+Every test runs once per storage backend so the engines are held to the
+same behaviour. The embedded memory engine always runs; Neo4j only runs
+when TEST_NEO4J_URI (with TEST_NEO4J_USER / TEST_NEO4J_PASSWORD) is set,
+never against the NEO4J_URI the app uses, and must point at a disposable
+database: statistics and summary tests scan the whole graph. The tests
+only create, and afterwards delete, nodes whose ids start with PREFIX.
+"""
+import os
+
+# Import the app on the embedded engine so collection never needs Neo4j
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend import crud, main, relationships, stats as stats_module, summary as summary_module
+from backend.changes import GraphChangeLog
+from backend.stats import GraphStats
+from backend.storage.memory_storage import MemoryStorage
+from backend.summary import GraphSummary, SUMMARY_MODES
+from backend.velocity import VelocityTracker
+
+PREFIX = "test_"
+
+CLEANUP_QUERY = """
+MATCH (n)
+WHERE n.user_id STARTS WITH $prefix OR n.txn_id STARTS WITH $prefix
+DETACH DELETE n
+"""
+
+
+def make_user(n, **fields):
+    return {
+        "user_id": f"{PREFIX}user{n}",
+        "name": f"Test User {n}",
+        "email": f"{PREFIX}user{n}@example.test",
+        "phone": f"{PREFIX}phone{n}",
+        "address": f"{PREFIX}address{n}",
+        "payment_method": f"{PREFIX}card{n}",
+        **fields,
+    }
+
+
+def make_transaction(n, sender, receiver, **fields):
+    return {
+        "txn_id": f"{PREFIX}txn{n}",
+        "sender_id": f"{PREFIX}user{sender}",
+        "receiver_id": f"{PREFIX}user{receiver}",
+        "amount": 10.0 * n,
+        "device_id": f"{PREFIX}device{n}",
+        "ip_address": f"{PREFIX}ip{n}",
+        **fields,
+    }
+
+
+@pytest.fixture(scope="session")
+def neo4j_storage():
+    uri = os.getenv("TEST_NEO4J_URI")
+    if not uri:
+        pytest.skip("set TEST_NEO4J_URI to a disposable Neo4j database to test the Neo4j engine")
+    from backend.database import Neo4jConnection
+    from backend.storage.neo4j_storage import Neo4jStorage
+
+    db = Neo4jConnection(uri, os.getenv("TEST_NEO4J_USER", "neo4j"), os.getenv("TEST_NEO4J_PASSWORD", "password"))
+    try:
+        db.verify_connectivity()
+        # Same constraints and indexes as a deployment, so the tests exercise the real query plans
+        failures = db.bootstrap_schema()
+    except Exception as e:
+        db.close()
+        pytest.fail(f"TEST_NEO4J_URI is set but Neo4j at {uri} is not usable: {e}")
+    if failures:
+        db.close()
+        pytest.fail(f"Schema bootstrap failed on {uri}: {failures}")
+    yield Neo4jStorage(db)
+    db.close()
+
+
+@pytest.fixture(params=["memory", "neo4j"])
+def storage(request, monkeypatch):
+    """A clean storage backend wired into every module, with fresh in-process caches."""
+    if request.param == "neo4j":
+        backend = request.getfixturevalue("neo4j_storage")
+        backend.db.query(CLEANUP_QUERY, {"prefix": PREFIX})
+        request.addfinalizer(lambda: backend.db.query(CLEANUP_QUERY, {"prefix": PREFIX}))
+    else:
+        backend = MemoryStorage()
+
+    for module in (main, crud, relationships, stats_module, summary_module):
+        monkeypatch.setattr(module, "storage", backend)
+
+    changelog = GraphChangeLog()
+    for module in (crud, summary_module):
+        monkeypatch.setattr(module, "changelog", changelog)
+
+    stats = GraphStats()
+    velocity = VelocityTracker()
+    for module in (crud, main):
+        monkeypatch.setattr(module, "stats", stats)
+        monkeypatch.setattr(module, "velocity", velocity)
+    summaries = {mode: GraphSummary(mode) for mode in SUMMARY_MODES}
+    monkeypatch.setattr(main, "summaries", summaries)
+    request.addfinalizer(lambda: [summary.stop() for summary in summaries.values()])
+
+    # Loaded up front so /graph ranks by degree instead of loading in the background
+    stats.ensure_loaded()
+    return backend
+
+
+@pytest.fixture
+def client(storage):
+    # Not entered as a context manager: no lifespan, so no background warm-up
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def ingest(client):
+    """POST users and transactions through the API, failing on any error."""
+    def ingest(users=(), transactions=()):
+        for user in users:
+            response = client.post("/users", json=user)
+            assert response.status_code == 200, response.text
+        for txn in transactions:
+            response = client.post("/transactions", json=txn)
+            assert response.status_code == 200, response.text
+    return ingest
@@ -0,0 +1,243 @@
+import time
+
+from backend import crud, main
+from backend.summary import GraphSummary, SUMMARY_MODES
+
+from conftest import PREFIX, make_user, make_transaction
+
+SHARED = {
+    "email": f"{PREFIX}shared@example.test",
+    "phone": f"{PREFIX}shared_phone",
+    "address": f"{PREFIX}shared_address",
+    "payment_method": f"{PREFIX}shared_card",
+}
+
+
+def connections(relationships, key):
+    return sorted(
+        connection["connected"].get("user_id") or connection["connected"].get("txn_id")
+        for connection in relationships[key]
+    )
+
+
+def test_post_user_upserts(client, ingest):
+    ingest(users=[make_user(1)])
+    ingest(users=[make_user(1, name="Renamed")])
+
+    users = [user for user in client.get("/users").json() if user["user_id"] == f"{PREFIX}user1"]
+    assert [user["name"] for user in users] == ["Renamed"]
+
+
+def test_post_transaction_validates_payload(client):
+    response = client.post("/transactions", json={"txn_id": f"{PREFIX}txn1"})
+
+    assert response.status_code == 422
+
+
+def test_shared_user_attributes_are_linked(client, ingest):
+    ingest(users=[make_user(1, **SHARED), make_user(2, **SHARED), make_user(3)])
+
+    relationships = client.get(f"/relationships/user/{PREFIX}user1").json()
+
+    for key in ("shared_email", "shared_phone", "shared_address", "shared_payment_method"):
+        assert connections(relationships, key) == [f"{PREFIX}user2"]
+    assert client.get(f"/relationships/user/{PREFIX}user3").json()["all_connections"] == []
+
+
+def test_shared_transaction_attributes_are_linked(client, ingest):
+    ingest(
+        users=[make_user(1), make_user(2)],
+        transactions=[
+            make_transaction(1, 1, 2, device_id=f"{PREFIX}device", ip_address=f"{PREFIX}ip"),
+            make_transaction(2, 2, 1, device_id=f"{PREFIX}device"),
+            make_transaction(3, 1, 2, ip_address=f"{PREFIX}ip"),
+        ],
+    )
+
+    relationships = client.get(f"/relationships/transaction/{PREFIX}txn1").json()
+
+    assert connections(relationships, "shared_device") == [f"{PREFIX}txn2"]
+    assert connections(relationships, "shared_ip") == [f"{PREFIX}txn3"]
+    assert relationships["sender"]["user_id"] == f"{PREFIX}user1"
+    assert relationships["receiver"]["user_id"] == f"{PREFIX}user2"
+    assert relationships["transaction_details"]["amount"] == 10.0
+
+
+def test_transactions_create_credit_and_debit(client, ingest):
+    ingest(users=[make_user(1), make_user(2)], transactions=[make_transaction(1, 1, 2)])
+
+    sender = client.get(f"/relationships/user/{PREFIX}user1").json()
+    receiver = client.get(f"/relationships/user/{PREFIX}user2").json()
+
+    assert connections(sender, "credit_to") == [f"{PREFIX}user2"]
+    assert connections(sender, "debit_from") == [f"{PREFIX}user2"]
+    assert connections(sender, "direct_transactions") == [f"{PREFIX}txn1"]
+    assert connections(receiver, "credit_to") == [f"{PREFIX}user1"]
+    assert connections(receiver, "debit_from") == [f"{PREFIX}user1"]
+    assert connections(receiver, "direct_transactions") == [f"{PREFIX}txn1"]
+
+
+def test_unknown_nodes_return_404(client):
+    assert client.get(f"/relationships/user/{PREFIX}missing").status_code == 404
+    assert client.get(f"/relationships/transaction/{PREFIX}missing").status_code == 404
+
+
+def test_graph_edges_only_reference_returned_nodes(client, ingest):
+    ingest(
+        users=[make_user(n, email=SHARED["email"]) for n in range(1, 4)],
+        transactions=[make_transaction(1, 1, 2), make_transaction(2, 2, 3)],
+    )
+
+    graph = client.get("/graph").json()
+    node_ids = {node["data"]["id"] for node in graph["nodes"]}
+    edges = [edge["data"] for edge in graph["edges"]]
+
+    assert isinstance(graph["version"], int)
+    assert all(edge["source"] in node_ids and edge["target"] in node_ids for edge in edges)
+    assert len(edges) == len({edge["id"] for edge in edges})
+
+
+def test_graph_limits_pick_most_connected(storage, ingest):
+    ingest(
+        users=[make_user(n) for n in range(1, 5)],
+        transactions=[
+            make_transaction(1, 1, 2),
+            make_transaction(2, 1, 3),
+            make_transaction(3, 1, 4),
+            make_transaction(4, 2, 3),
+        ],
+    )
+
+    graph = crud.get_graph_data(user_limit=1, txn_limit=2)
+    users = [node["data"] for node in graph["nodes"] if node["data"]["type"] == "user"]
+    transactions = [node["data"] for node in graph["nodes"] if node["data"]["type"] == "transaction"]
+
+    top_user = crud.stats.top("user", "degree", 1)[0]["key"]
+    assert [user["id"] for user in users] == [top_user]
+    assert len(transactions) <= 2
+
+
+def test_change_feed_carries_only_new_edges(client, ingest):
+    version = client.get("/graph").json()["version"]
+    ingest(users=[make_user(1), make_user(2)], transactions=[make_transaction(1, 1, 2)])
+
+    changes = client.get(f"/graph/changes?since={version}").json()
+    assert not changes["reset"]
+    assert {node["data"]["id"] for node in changes["nodes"]} == {
+        f"{PREFIX}user1", f"{PREFIX}user2", f"{PREFIX}txn1"
+    }
+    assert sorted(edge["data"]["type"] for edge in changes["edges"]) == [
+        "CREDIT_TO", "DEBIT_FROM", "RECEIVED_BY", "SENT"
+    ]
+
+    # Re-posting updates the node but creates no edges
+    ingest(transactions=[make_transaction(1, 1, 2, amount=99.0)])
+    changes = client.get(f"/graph/changes?since={changes['version']}").json()
+    assert [node["data"]["amount"] for node in changes["nodes"]] == [99.0]
+    assert changes["edges"] == []
+
+
+def test_change_feed_resets_across_epochs(client, ingest):
+    graph = client.get("/graph").json()
+    ingest(users=[make_user(1)])
+
+    same = client.get(f"/graph/changes?since={graph['version']}&epoch={graph['epoch']}").json()
+    assert not same["reset"]
+    assert same["epoch"] == graph["epoch"]
+
+    # A version issued by another process (e.g. before a restart) must not be trusted
+    other = client.get(f"/graph/changes?since={graph['version']}&epoch=previous").json()
+    assert other["reset"]
+    assert other["epoch"] == graph["epoch"]
+
+
+def test_velocity_ignores_reposted_transactions(client, ingest):
+    txn = make_transaction(1, 1, 2)
+    ingest(users=[make_user(1), make_user(2)], transactions=[txn, txn])
+
+    counts = client.get(f"/velocity/device/{txn['device_id']}").json()["counts"]
+
+    assert counts == {"1m": 1, "1h": 1, "24h": 1}
+
+
+def test_summary_components(client, ingest):
+    ingest(
+        users=[make_user(n) for n in range(1, 5)],
+        transactions=[make_transaction(1, 1, 2)],
+    )
+    main.summaries["component"].refresh()
+
+    cluster = client.get(f"/graph/summary/{PREFIX}txn1?mode=component")
+    assert cluster.status_code == 200
+    assert sorted(cluster.json()["members"]) == [f"{PREFIX}txn1", f"{PREFIX}user1", f"{PREFIX}user2"]
+    assert client.get(f"/graph/summary/{PREFIX}missing").status_code == 404
+
+
+def test_summary_builds_in_background(client, ingest):
+    summary = main.summaries["component"]
+
+    first = client.get("/graph/summary?mode=component")
+    if first.status_code == 503:
+        assert first.headers["Retry-After"]
+        summary.refresh()
+
+    # Writes reach the summary through the follower thread, not through reads
+    ingest(users=[make_user(1), make_user(2)], transactions=[make_transaction(1, 1, 2)])
+    version = main.crud.changelog.version
+    deadline = time.monotonic() + 5
+    while summary.version != version and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert summary.version == version
+
+
+def test_shared_summary_keeps_other_edges_as_weights(client, ingest):
+    ingest(
+        users=[make_user(n, email=SHARED["email"]) for n in (1, 2)] + [make_user(3), make_user(4)],
+        transactions=[make_transaction(1, 1, 3), make_transaction(2, 3, 4)],
+    )
+    main.summaries["shared"].refresh()
+
+    summary = client.get("/graph/summary?mode=shared&limit=100000").json()
+    weights = {
+        (edge["data"]["source"], edge["data"]["target"]): edge["data"]["weight"]
+        for edge in summary["edges"]
+    }
+    user1, user3, txn1 = f"{PREFIX}user1", f"{PREFIX}user3", f"{PREFIX}txn1"
+
+    # user1/user2 share an email; CREDIT_TO, DEBIT_FROM and SENT reach the other clusters
+    assert weights[(txn1, user1)] == 1
+    assert weights[(user1, user3)] == 2
+    assert summary["total_edges"] == sum(weights.values()) + sum(
+        node["data"]["internal_edges"] for node in summary["nodes"]
+    )
+
+
+def test_incremental_summary_matches_full_load(client, ingest):
+    ingest(users=[make_user(n, email=SHARED["email"]) for n in range(1, 4)])
+    for mode in SUMMARY_MODES:
+        main.summaries[mode].refresh()
+
+    ingest(
+        users=[make_user(n) for n in range(4, 7)],
+        transactions=[make_transaction(1, 1, 4), make_transaction(2, 5, 6), make_transaction(3, 4, 5)],
+    )
+    for mode in SUMMARY_MODES:
+        main.summaries[mode].refresh()
+
+    # Union-find clusters do not depend on edge order, so both paths must agree exactly
+    for mode in ("component", "shared"):
+        incremental = client.get(f"/graph/summary?mode={mode}&limit=100000").json()
+        full = GraphSummary(mode)
+        full.refresh()
+        full = full.get_summary(limit=100000)
+        assert incremental["cluster_count"] == full["cluster_count"], mode
+        assert incremental["total_edges"] == full["total_edges"], mode
+        assert incremental["nodes"] == full["nodes"], mode
+        assert incremental["edges"] == full["edges"], mode
+
+    # Label propagation is order dependent; check the aggregates are consistent
+    community = client.get("/graph/summary?mode=community&limit=100000").json()
+    clusters = [node["data"] for node in community["nodes"]]
+    assert sum(cluster["size"] for cluster in clusters) == community["total_nodes"]
+    assert sum(cluster["internal_edges"] for cluster in clusters) + \
+        sum(edge["data"]["weight"] for edge in community["edges"]) == community["total_edges"]
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+import anyio.to_thread
+import pytest
+
+from backend import main
+from backend.concurrency import AdmissionPool, PoolFull, SingleFlight
+
+
+def call_concurrently(flight, fn, callers=5):
+    """Run `fn` through the flight from several threads; returns each caller's result or exception."""
+    outcomes = [None] * callers
+
+    def call(i):
+        try:
+            outcomes[i] = flight.do("key", fn)
+        except Exception as e:
+            outcomes[i] = e
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight, release, calls = SingleFlight(), threading.Event(), []
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {"rows": len(calls)}
+
+    threads, outcomes = call_concurrently(flight, fn)
+    time.sleep(0.1)  # let every caller join the in-flight call
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert all(outcome is outcomes[0] for outcome in outcomes)
+
+    # Once the call has finished, the next one runs again
+    assert flight.do("key", fn) == {"rows": 2}
+
+
+def test_single_flight_shares_exceptions():
+    flight, release = SingleFlight(), threading.Event()
+
+    def fn():
+        release.wait(5)
+        raise ValueError("query failed")
+
+    threads, outcomes = call_concurrently(flight, fn)
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert all(outcome is outcomes[0] for outcome in outcomes)
+
+
+def test_admission_pool_rejects_beyond_queue():
+    async def scenario():
+        pool = AdmissionPool("read", max_concurrent=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def handler():
+            await release.wait()
+            return "done"
+
+        running = [asyncio.create_task(pool.run(handler)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(PoolFull):
+            await pool.run(handler)
+
+        release.set()
+        assert await asyncio.gather(*running) == ["done", "done"]
+        assert pool.pending == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_pool_answers_429_with_retry_after(client, monkeypatch):
+    monkeypatch.setattr(main, "read_pool", AdmissionPool("read", max_concurrent=0, max_queue=0, retry_after=7))
+
+    response = client.get("/users")
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    # Unpooled endpoints keep answering
+    assert client.get("/health").status_code == 200
+
+
+def test_threadpool_covers_both_pools(monkeypatch):
+    monkeypatch.setattr(main, "read_pool", AdmissionPool("read", max_concurrent=50, max_queue=0))
+    monkeypatch.setattr(main, "write_pool", AdmissionPool("write", max_concurrent=20, max_queue=0))
+
+    async def tokens():
+        main.size_threadpool()
+        return anyio.to_thread.current_default_thread_limiter().total_tokens
+
+    assert asyncio.run(tokens()) == 50 + 20 + main.UNPOOLED_THREADS
@@ -0,0 +1,130 @@
+import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend import relink
+from backend.relink import CheckpointMismatch, load_checkpoint, open_checkpoint, plan_tasks
+
+SETTINGS = {"batch_size": 500, "max_cardinality": 0, "max_pairs": 100}
+
+
+class PlanningDB:
+    """Answers the planner's read queries from {label: {id: properties}}."""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def stream(self, query, params=None):
+        nodes = self.nodes.get(re.search(r"MATCH \(n:(\w+)", query).group(1), {})
+        if "count(*)" in query:
+            field = re.search(r"WHERE n\.(\w+) IS NOT NULL", query).group(1)
+            counts = Counter(node[field] for node in nodes.values() if node.get(field) is not None)
+            for value in sorted(counts):
+                yield {"value": value, "count": counts[value]}
+        elif params:
+            field = re.search(r"\{(\w+): \$value\}", query).group(1)
+            for node_id in sorted(i for i, node in nodes.items() if node.get(field) == params["value"]):
+                yield {"id": node_id}
+        else:
+            for node_id in sorted(nodes):
+                yield {"id": node_id}
+
+
+class NoDatabase:
+    def __init__(self, *args):
+        pass
+
+    def close(self):
+        pass
+
+
+def users_with_emails(*emails):
+    return {"User": {f"user{n}": {"email": email} for n, email in enumerate(emails, 1)}}
+
+
+def email_link_tasks(tasks):
+    return [task for task in tasks if task["id"].startswith("link:SHARED_EMAIL")]
+
+
+def test_link_batches_are_bounded_by_pairs():
+    db = PlanningDB(users_with_emails(*["hub"] * 5, "pair", "pair", "solo"))
+
+    tasks = email_link_tasks(plan_tasks(db, batch_size=500, max_cardinality=0, max_pairs=10))
+
+    # "pair" fits a value batch; "hub" (25 candidate pairs) is split into chunks of its nodes
+    assert [task.get("values") for task in tasks if "value" not in task] == [["pair"]]
+    assert [(task["value"], task["ids"]) for task in tasks if "value" in task] == [
+        ("hub", ["user1", "user2"]),
+        ("hub", ["user3", "user4"]),
+        ("hub", ["user5"]),
+    ]
+
+
+def test_values_over_the_cap_are_not_planned():
+    db = PlanningDB(users_with_emails(*["hub"] * 5, "pair", "pair"))
+
+    tasks = email_link_tasks(plan_tasks(db, batch_size=500, max_cardinality=4, max_pairs=10))
+
+    assert [task["values"] for task in tasks] == [["pair"]]
+
+
+def test_fingerprint_follows_batch_contents():
+    assert relink._fingerprint(["a", "b"]) == relink._fingerprint(["a", "b"])
+    assert relink._fingerprint(["a", "b"]) != relink._fingerprint(["a", "c"])
+
+
+def test_checkpoint_round_trip(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    with open_checkpoint(path, SETTINGS, resume=False) as log:
+        log.write('{"id": "t1", "fingerprint": "1:aa"}\n')
+        log.write('{"id": "t2", "fing')  # torn by an interrupted write
+
+    assert load_checkpoint(path, SETTINGS) == {"t1": "1:aa"}
+    with pytest.raises(CheckpointMismatch):
+        load_checkpoint(path, {**SETTINGS, "batch_size": 100})
+
+
+def test_resume_skips_completed_and_reruns_changed_tasks(tmp_path, monkeypatch):
+    path = str(tmp_path / "checkpoint.jsonl")
+    runs, failing = [], set()
+
+    def run_task(task, dry_run=False, max_cardinality=0):
+        runs.append(task["id"])
+        if task["id"] in failing:
+            raise RuntimeError(f"{task['id']} failed")
+        return task["id"], task["action"], task["rel_type"], 1
+
+    def plan(values):
+        return lambda db, *args: [
+            relink._task(f"link:SHARED_EMAIL:{index}", "link", "SHARED_EMAIL", "values", [value])
+            for index, value in enumerate(values)
+        ]
+
+    monkeypatch.setattr(relink, "Neo4jConnection", NoDatabase)
+    monkeypatch.setattr(relink, "ProcessPoolExecutor", ThreadPoolExecutor)
+    monkeypatch.setattr(relink, "run_task", run_task)
+    options = dict(workers=1, batch_size=500, checkpoint=path, max_cardinality=0, max_pairs=100)
+
+    monkeypatch.setattr(relink, "plan_tasks", plan(["a", "b"]))
+    failing.add("link:SHARED_EMAIL:1")
+    with pytest.raises(RuntimeError):
+        relink.relink(**options)
+    assert list(load_checkpoint(path, SETTINGS)) == ["link:SHARED_EMAIL:0"]
+
+    # Only the failed task runs again
+    runs.clear()
+    failing.clear()
+    totals = relink.relink(resume=True, **options)
+    assert runs == ["link:SHARED_EMAIL:1"]
+    assert totals["SHARED_EMAIL"]["added"] == 1
+
+    # A task whose data shifted under its id is not trusted
+    runs.clear()
+    monkeypatch.setattr(relink, "plan_tasks", plan(["a", "c"]))
+    relink.relink(resume=True, **options)
+    assert runs == ["link:SHARED_EMAIL:1"]
+
+    with pytest.raises(CheckpointMismatch):
+        relink.relink(resume=True, **{**options, "max_pairs": 10})
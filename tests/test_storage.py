@@ -0,0 +1,203 @@
+from collections import Counter
+
+import pytest
+
+from backend import crud, stats as stats_module
+from backend.stats import GraphStats
+from backend.storage.memory_storage import MemoryStorage
+
+from conftest import PREFIX, make_user, make_transaction
+
+
+def ids(*names):
+    return [f"{PREFIX}{name}" for name in names]
+
+
+def test_upsert_user_returns_previous_properties(storage):
+    user = make_user(1)
+
+    assert storage.upsert_user(user) == {"user_id": user["user_id"]}
+    previous = storage.upsert_user({**user, "email": f"{PREFIX}changed@example.test"})
+
+    assert previous == user
+
+
+def test_upsert_transaction_reports_created_edges_once(storage):
+    storage.upsert_user(make_user(1))
+    storage.upsert_user(make_user(2))
+    txn = make_transaction(1, 1, 2)
+
+    previous, created = storage.upsert_transaction(txn)
+    assert previous == {"txn_id": txn["txn_id"]}
+    assert sorted(created) == sorted([
+        (txn["sender_id"], txn["txn_id"], "SENT"),
+        (txn["txn_id"], txn["receiver_id"], "RECEIVED_BY"),
+    ])
+
+    previous, created = storage.upsert_transaction(txn)
+    assert previous["amount"] == txn["amount"]
+    assert created == []
+
+
+def test_upsert_transaction_without_users_creates_no_edges(storage):
+    _, created = storage.upsert_transaction(make_transaction(1, 1, 2))
+
+    assert created == []
+    assert storage.get_neighbours("Transaction", f"{PREFIX}txn1")[1] == []
+
+
+def test_link_user_created_flags(storage):
+    storage.upsert_user(make_user(1, email=f"{PREFIX}shared@example.test"))
+    storage.upsert_user(make_user(2, email=f"{PREFIX}shared@example.test"))
+
+    assert storage.link_user(f"{PREFIX}user2") == [
+        (f"{PREFIX}user2", f"{PREFIX}user1", "SHARED_EMAIL", True)
+    ]
+    assert storage.link_user(f"{PREFIX}user2") == [
+        (f"{PREFIX}user2", f"{PREFIX}user1", "SHARED_EMAIL", False)
+    ]
+
+
+def test_link_user_skips_attribute_kinds(storage):
+    storage.upsert_user(make_user(1, email=f"{PREFIX}shared@example.test"))
+    storage.upsert_user(make_user(2, email=f"{PREFIX}shared@example.test"))
+
+    assert storage.link_user(f"{PREFIX}user2", skip={"email"}) == []
+
+
+def test_link_transaction_created_flags(storage):
+    storage.upsert_user(make_user(1))
+    storage.upsert_user(make_user(2))
+    storage.upsert_transaction(make_transaction(1, 1, 2, ip_address=f"{PREFIX}shared_ip"))
+    storage.upsert_transaction(make_transaction(2, 1, 2, ip_address=f"{PREFIX}shared_ip"))
+    user1, user2, txn1, txn2 = ids("user1", "user2", "txn1", "txn2")
+
+    assert sorted(storage.link_transaction(txn1)) == sorted([
+        (txn1, txn2, "SHARED_IP", True),
+        (user1, txn1, "SENT", False),
+        (txn1, user2, "RECEIVED_BY", False),
+        (user1, user2, "CREDIT_TO", True),
+        (user2, user1, "DEBIT_FROM", True),
+    ])
+    # The second transaction shares the sender/receiver pair, so only its IP edge is new
+    assert sorted(storage.link_transaction(txn2)) == sorted([
+        (txn2, txn1, "SHARED_IP", True),
+        (user1, txn2, "SENT", False),
+        (txn2, user2, "RECEIVED_BY", False),
+        (user1, user2, "CREDIT_TO", False),
+        (user2, user1, "DEBIT_FROM", False),
+    ])
+
+
+def test_link_user_creates_credit_and_debit(storage):
+    storage.upsert_user(make_user(1))
+    storage.upsert_user(make_user(2))
+    storage.upsert_transaction(make_transaction(1, 1, 2))
+    user1, user2 = ids("user1", "user2")
+
+    assert storage.link_user(user1) == [(user1, user2, "CREDIT_TO", True)]
+    assert storage.link_user(user2) == [(user2, user1, "DEBIT_FROM", True)]
+
+
+def test_get_neighbours_missing_node(storage):
+    assert storage.get_neighbours("User", f"{PREFIX}missing") is None
+    assert storage.get_neighbours("Transaction", f"{PREFIX}missing") is None
+
+
+def test_get_edges_between_respects_ids_and_limit(storage):
+    for n in range(1, 5):
+        storage.upsert_user(make_user(n, phone=f"{PREFIX}shared_phone"))
+        storage.link_user(f"{PREFIX}user{n}")
+    # user2 -> user1, user3 -> user1/user2, user4 -> user1/user2/user3
+    wanted = ids("user1", "user2", "user3")
+
+    edges = storage.get_edges_between(wanted, limit=100)
+    assert len(edges) == 3
+    assert all(source in wanted and target in wanted for source, target, _ in edges)
+    assert {rel_type for _, _, rel_type in edges} == {"SHARED_PHONE"}
+
+    assert len(storage.get_edges_between(wanted, limit=2)) == 2
+    assert len(storage.get_edges_between(ids("user1", "user2", "user3", "user4"), limit=100)) == 6
+
+
+def test_get_nodes_splits_users_and_transactions(storage):
+    storage.upsert_user(make_user(1))
+    storage.upsert_transaction(make_transaction(1, 1, 2))
+
+    users, transactions = storage.get_nodes(ids("user1", "txn1", "missing"))
+
+    assert [user["user_id"] for user in users] == ids("user1")
+    assert [txn["txn_id"] for txn in transactions] == ids("txn1")
+
+
+def test_bootstrapped_stats_match_ingest(storage, ingest):
+    shared = {"email": f"{PREFIX}shared@example.test", "payment_method": f"{PREFIX}card"}
+    ingest(
+        users=[make_user(1, **shared), make_user(2, **shared), make_user(3)],
+        transactions=[
+            make_transaction(1, 1, 2, device_id=f"{PREFIX}device"),
+            make_transaction(2, 2, 3, device_id=f"{PREFIX}device"),
+            make_transaction(3, 1, 2),
+        ],
+    )
+    # Re-posting must not count anything twice
+    ingest(users=[make_user(1, **shared)], transactions=[make_transaction(3, 1, 2)])
+
+    recorded = crud.stats
+    loaded = GraphStats()
+    loaded.ensure_loaded()
+
+    for node_kind in ("user", "transaction"):
+        assert only_test_keys(loaded.degree[node_kind]) == only_test_keys(recorded.degree[node_kind])
+    assert only_test_keys(loaded.cardinality["email"]) == only_test_keys(recorded.cardinality["email"])
+    # SHARED_EMAIL and SHARED_PAYMENT_METHOD both ways (re-linked on re-post),
+    # two SENT, CREDIT_TO and DEBIT_FROM
+    assert recorded.degree["user"][f"{PREFIX}user1"] == 8
+
+
+def only_test_keys(counts):
+    return Counter({key: count for key, count in counts.items() if str(key).startswith(PREFIX)})
+
+
+def test_failed_stats_bootstrap_backs_off(monkeypatch):
+    scans = []
+
+    class Unreachable(MemoryStorage):
+        def attribute_counts(self, label, field):
+            scans.append(label)
+            raise ConnectionError("database unreachable")
+
+    monkeypatch.setattr(stats_module, "storage", Unreachable())
+    stats = GraphStats()
+
+    with pytest.raises(ConnectionError):
+        stats.ensure_loaded()
+    # Neither a blocking caller nor the /graph background trigger scans again while backing off
+    with pytest.raises(RuntimeError, match="database unreachable"):
+        stats.ensure_loaded()
+    stats.load_in_background()
+
+    assert len(scans) == 1
+    assert not stats.loaded
+
+
+def test_cardinality_cap_applies_before_stats_load(storage, ingest, monkeypatch):
+    monkeypatch.setattr(stats_module, "MAX_LINK_CARDINALITY", 2)
+    # Never bootstrapped, so the counters only hold deltas
+    unloaded = GraphStats()
+    monkeypatch.setattr(stats_module.GraphStats, "load_in_background", lambda self: None)
+    monkeypatch.setattr(crud, "stats", unloaded)
+    phone = f"{PREFIX}hub_phone"
+    storage.upsert_user(make_user(1, phone=phone))
+
+    ingest(users=[make_user(n, phone=phone) for n in (2, 3)])
+
+    # user2 makes two holders of the phone (linked); user3 makes three (over the cap)
+    assert shared_phone_neighbours(storage, "user2") == ids("user1")
+    assert shared_phone_neighbours(storage, "user3") == []
+    assert unloaded.hub_attributes("user", make_user(4, phone=phone)) == {"phone"}
+
+
+def shared_phone_neighbours(storage, name):
+    _, neighbours = storage.get_neighbours("User", f"{PREFIX}{name}")
+    return sorted(other["user_id"] for rel_type, _, other in neighbours if rel_type == "SHARED_PHONE")